@@ -0,0 +1,183 @@
+import argparse
+import corpus
+import gc
+import json
+import math
+import os
+import random
+import struct
+import sys
+import time
+import typing
+
+# Measure encode/decode throughput of the core types over a deterministic corpus, or fuzz the decoders with mutated
+# buffers.
+#
+# $ python bench/codec.py                 # Print the throughput of each object.
+# $ python bench/codec.py --save          # Store the result as the regression baseline.
+# $ python bench/codec.py --check         # Compare against the regression baseline.
+#
+# Absolute speeds depend on the machine and its load. Every result is therefore also stored relative to a fixed pure
+# python workload measured right before it, and the check compares these relative scores, not the raw ops/s.
+# $ python bench/codec.py --fuzz 10000    # Round-trip 10000 mutated buffers.
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--baseline', type=str, default=os.path.join(os.path.dirname(__file__), 'baseline.json'))
+parser.add_argument('--check', action='store_true', help='compare against the baseline')
+parser.add_argument('--fuzz', type=int, default=0, help='number of mutated buffers')
+parser.add_argument('--repeat', type=int, default=3, help='rounds measured for each object, the best one is kept')
+parser.add_argument('--save', action='store_true', help='save the result as the baseline')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--time', type=float, default=0.5, help='minimum seconds spent on each measurement')
+parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slowdown of the mean score')
+args = parser.parse_args()
+
+
+def measure(f: typing.Callable[[], object]) -> float:
+    # Return the number of calls per second.
+    n = 0
+    s = time.perf_counter()
+    e = s
+    while e - s < args.time:
+        f()
+        n += 1
+        e = time.perf_counter()
+    return n / (e - s)
+
+
+calibration_data = bytearray(range(256)) * 4
+
+
+def calibration() -> object:
+    # A fixed workload of the same kind as the codecs: slicing buffers and converting integers.
+    return [int.from_bytes(calibration_data[i:i + 4], 'little') for i in range(0, len(calibration_data), 4)]
+
+
+def score(f: typing.Callable[[], object]) -> tuple[float, float]:
+    # Return the calls per second of f, and the same relative to the calibration workload. Both are measured back to
+    # back in every round, so a slower machine or a busy neighbour affects them alike. As in timeit, the fastest round
+    # of each is kept, slower rounds only measure interference, and the garbage collector is paused.
+    ops = 0.0
+    cal = 0.0
+    gc.disable()
+    try:
+        for _ in range(args.repeat):
+            cal = max(cal, measure(calibration))
+            ops = max(ops, measure(f))
+    finally:
+        gc.enable()
+    return ops, ops / cal
+
+
+def bench() -> dict:
+    r = {}
+    for name, kype, item in corpus.corpus(args.seed):
+        data = item.molecule()
+        assert kype.molecule_decode(data) == item
+        encode, encode_score = score(item.molecule)
+        decode, decode_score = score(lambda: kype.molecule_decode(data))
+        r[name] = {
+            'size': len(data),
+            'encode_ops': round(encode, 1),
+            'encode_mbs': round(encode * len(data) / 1024 / 1024, 2),
+            'encode_score': round(encode_score, 4),
+            'decode_ops': round(decode, 1),
+            'decode_mbs': round(decode * len(data) / 1024 / 1024, 2),
+            'decode_score': round(decode_score, 4),
+        }
+        print(f'{name:<24} {len(data):>9} bytes', end='')
+        print(f' encode {encode:>10.1f} ops/s {r[name]["encode_mbs"]:>8.2f} MB/s', end='')
+        print(f' decode {decode:>10.1f} ops/s {r[name]["decode_mbs"]:>8.2f} MB/s')
+    return r
+
+
+def check(result: dict) -> bool:
+    # On a shared machine the score of a single object swings by a quarter between runs, the geometric mean over all
+    # objects by a tenth. The check fails if the mean slows down by more than the tolerance, or any object by half.
+    with open(args.baseline) as f:
+        base = json.load(f)
+    done = True
+    for k in ['encode_score', 'decode_score']:
+        ratio = {name: e[k] / base[name][k] for name, e in result.items() if name in base}
+        for name, e in ratio.items():
+            if e < 0.5:
+                print(f'{name} {k} regressed: {result[name][k]:.4f} < {base[name][k]:.4f}')
+                done = False
+        mean = math.exp(sum([math.log(e) for e in ratio.values()]) / len(ratio))
+        print(f'{k} {mean:.3f} of the baseline')
+        if mean < 1 - args.tolerance:
+            done = False
+    return done
+
+
+def mutate(r: random.Random, data: bytearray) -> bytearray:
+    data = data.copy()
+    match r.randint(0, 5):
+        case 0:
+            # Flip a bit.
+            i = r.randrange(len(data))
+            data[i] ^= 1 << r.randint(0, 7)
+        case 1:
+            # Replace a byte.
+            data[r.randrange(len(data))] = r.randint(0, 255)
+        case 2:
+            # Truncate.
+            del data[r.randrange(len(data)):]
+        case 3:
+            # Extend.
+            data.extend(r.randbytes(r.randint(1, 16)))
+        case 4:
+            # Corrupt a 4-byte word, which hits the size and offset fields of tables.
+            i = r.randrange(0, max(1, len(data) - 3), 4)
+            word = r.choice([0, 4, len(data), len(data) + 4, 0xffffffff, r.getrandbits(32)])
+            data[i:i+4] = word.to_bytes(4, 'little')
+        case 5:
+            # Swap two slices.
+            i = r.randrange(len(data))
+            j = r.randrange(len(data))
+            i, j = min(i, j), max(i, j)
+            data = data[j:] + data[i:j] + data[:i]
+    return data
+
+
+def fuzz() -> bool:
+    r = random.Random(args.seed)
+    # Big objects are skipped to keep each round cheap.
+    c = [(n, k, i.molecule()) for n, k, i in corpus.corpus(args.seed) if len(i.molecule()) < 1 << 16]
+    done = True
+    reject = 0
+    for i in range(args.fuzz):
+        name, kype, data = r.choice(c)
+        data = mutate(r, data)
+        try:
+            item = kype.molecule_decode(data)
+        except (AssertionError, IndexError, KeyError, ValueError, struct.error):
+            reject += 1
+            continue
+        except Exception as e:
+            print(f'round {i} {name}: decode raised {e!r}: {data.hex()}')
+            done = False
+            continue
+        # Once decoded, the object must survive a round trip unchanged.
+        try:
+            back = kype.molecule_decode(item.molecule())
+        except Exception as e:
+            print(f'round {i} {name}: re-decode raised {e!r}: {data.hex()}')
+            done = False
+            continue
+        if back != item:
+            print(f'round {i} {name}: round trip mismatch: {data.hex()}')
+            done = False
+    print(f'fuzz {args.fuzz} rounds, {reject} rejected, {args.fuzz - reject} decoded')
+    return done
+
+
+if args.fuzz:
+    sys.exit(0 if fuzz() else 1)
+result = bench()
+if args.save:
+    with open(args.baseline, 'w') as f:
+        json.dump(result, f, indent=4)
+        f.write('\n')
+if args.check:
+    sys.exit(0 if check(result) else 1)
@@ -0,0 +1,80 @@
+import pyckb
+import random
+
+# A deterministic corpus of realistic core objects. The same seed always produces the same objects, so benchmark
+# results and fuzz findings can be reproduced.
+
+
+def script(r: random.Random) -> pyckb.core.Script:
+    return pyckb.core.Script(
+        pyckb.config.mainnet.script.secp256k1_blake160.code_hash,
+        pyckb.config.mainnet.script.secp256k1_blake160.hash_type,
+        bytearray(r.randbytes(20)),
+    )
+
+
+def script_type(r: random.Random) -> pyckb.core.Script:
+    return pyckb.core.Script(bytearray(r.randbytes(32)), pyckb.core.script_hash_type_type, bytearray(r.randbytes(32)))
+
+
+def out_point(r: random.Random) -> pyckb.core.OutPoint:
+    return pyckb.core.OutPoint(bytearray(r.randbytes(32)), r.randint(0, 16))
+
+
+def header(r: random.Random) -> pyckb.core.Header:
+    return pyckb.core.Header(pyckb.core.RawHeader(
+        0,
+        0x1a08a97e,
+        r.randint(0x16e77208628, 0x19a77208628),
+        r.randint(0, 0xffffff),
+        pyckb.core.epoch_encode(r.randint(0, 0xffff), r.randint(0, 1799), 1800),
+        bytearray(r.randbytes(32)),
+        bytearray(r.randbytes(32)),
+        bytearray(r.randbytes(32)),
+        bytearray(r.randbytes(32)),
+        bytearray(r.randbytes(32)),
+    ), r.getrandbits(128))
+
+
+def transaction(r: random.Random, inputs: int, outputs: int, witness: int) -> pyckb.core.Transaction:
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.cell_deps.append(pyckb.core.CellDep(out_point(r), 1))
+    tx.raw.cell_deps.append(pyckb.core.CellDep(out_point(r), 0))
+    tx.raw.header_deps.append(bytearray(r.randbytes(32)))
+    for _ in range(inputs):
+        tx.raw.inputs.append(pyckb.core.CellInput(0, out_point(r)))
+    for i in range(outputs):
+        kype = script_type(r) if i % 4 == 3 else None
+        tx.raw.outputs.append(pyckb.core.CellOutput(r.randint(61, 1 << 32) * 10**8, script(r), kype))
+        tx.raw.outputs_data.append(bytearray(r.randbytes(16)) if kype else bytearray())
+    tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(r.randbytes(65)), None, None).molecule())
+    if witness:
+        tx.witnesses.append(pyckb.core.WitnessArgs(None, bytearray(r.randbytes(witness)), None).molecule())
+    for _ in range(inputs - len(tx.witnesses)):
+        tx.witnesses.append(bytearray())
+    return tx
+
+
+def block(r: random.Random, uncles: int, transactions: int) -> pyckb.core.Block:
+    return pyckb.core.Block(
+        header(r),
+        [pyckb.core.UncleBlock(header(r), []) for _ in range(uncles)],
+        [transaction(r, r.randint(1, 4), r.randint(1, 4), 0) for _ in range(transactions)],
+        [bytearray(r.randbytes(10)) for _ in range(r.randint(0, 32))],
+    )
+
+
+def corpus(seed: int = 0) -> list[tuple[str, type, object]]:
+    # Return a list of (name, class, object). The class provides molecule_decode for the object.
+    r = random.Random(seed)
+    c = []
+    c.append(('script', pyckb.core.Script, script(r)))
+    c.append(('out_point', pyckb.core.OutPoint, out_point(r)))
+    c.append(('cell_output', pyckb.core.CellOutput, pyckb.core.CellOutput(61 * 10**8, script(r), script_type(r))))
+    c.append(('witness_args', pyckb.core.WitnessArgs, pyckb.core.WitnessArgs(bytearray(65), None, None)))
+    c.append(('header', pyckb.core.Header, header(r)))
+    for n in [1, 2, 16, 128, 2000]:
+        c.append((f'transaction_{n}_inputs', pyckb.core.Transaction, transaction(r, n, 2, 0)))
+    c.append(('transaction_1m_witness', pyckb.core.Transaction, transaction(r, 1, 2, 1 << 20)))
+    c.append(('block_2_uncles', pyckb.core.Block, block(r, 2, 64)))
+    return c
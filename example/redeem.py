@@ -1,5 +1,4 @@
 import argparse
-import math
 import pyckb
 
 # Attempt to withdraw all funds from Dao. When running the test case of pyckb by 'pytest -v', a part of ckb will be
@@ -19,6 +18,8 @@ if args.net == 'testnet':
     pyckb.config.current = pyckb.config.testnet
 
 user = pyckb.wallet.Wallet(int(args.prikey, 0))
+dao = pyckb.dao.Calculator()
+tip = pyckb.rpc.get_tip_header()
 for e in user.dao_livecell():
     if e['output_data'] == '0x0000000000000000':
         out_point = pyckb.core.OutPoint.rpc_decode(e['out_point'])
@@ -26,20 +27,10 @@ for e in user.dao_livecell():
         pyckb.rpc.wait(f'0x{hash.hex()}')
         print(f'0x{hash.hex()}')
     else:
-        deposit_block_number_byte = bytearray.fromhex(e['output_data'][2:])
-        deposit_block_number = int.from_bytes(deposit_block_number_byte, 'little')
-        deposit_block_header = pyckb.rpc.get_header_by_number(hex(deposit_block_number))
-        deposit_block_epoch = pyckb.core.epoch_decode(int(deposit_block_header['epoch'], 16))
-        deposit_block_epoch_float = deposit_block_epoch[0] + deposit_block_epoch[1] / deposit_block_epoch[2]
-        prepare_block_header = pyckb.rpc.get_header_by_number(e['block_number'])
-        prepare_block_epoch = pyckb.core.epoch_decode(int(prepare_block_header['epoch'], 16))
-        prepare_block_epoch_float = prepare_block_epoch[0] + prepare_block_epoch[1] / prepare_block_epoch[2]
-        extract_since_delay = math.ceil((prepare_block_epoch_float - deposit_block_epoch_float) / 180) * 180
-        extract_since_epoch_float = deposit_block_epoch_float + extract_since_delay
-        current_block_epoch = pyckb.core.epoch_decode(int(pyckb.rpc.get_tip_header()['epoch'], 16))
-        current_block_epoch_float = current_block_epoch[0] + current_block_epoch[1] / current_block_epoch[2]
-        if current_block_epoch_float < extract_since_epoch_float:
-            break
+        deposit_block_number = int.from_bytes(bytearray.fromhex(e['output_data'][2:]), 'little')
+        prepare_block_number = int(e['block_number'], 16)
+        if not pyckb.dao.mature(dao.since(deposit_block_number, prepare_block_number), int(tip['epoch'], 16)):
+            continue
         out_point = pyckb.core.OutPoint.rpc_decode(e['out_point'])
         hash = user.dao_extract(out_point)
         pyckb.rpc.wait(f'0x{hash.hex()}')
@@ -27,17 +27,36 @@ if args.hash:
     tx_json = pyckb.rpc.get_transaction(args.hash)['transaction']
 tx = pyckb.core.Transaction.rpc_decode(tx_json)
 
+
+
+def fetch(tx_hashes: list[str]) -> dict[str, dict]:
+    # Get many transactions in a single batch request, each distinct transaction once. If pyckb.rpc.cache is set,
+    # committed transactions seen before are served from it.
+    tx_hashes = list(dict.fromkeys(tx_hashes))
+    r = {}
+    calls = [('get_transaction', [h]) for h in tx_hashes]
+    for h, e in zip(tx_hashes, pyckb.rpc.batch_cache(calls, pyckb.rpc.committed)):
+        if isinstance(e, Exception):
+            raise e
+        r[h] = e
+    return r
+
+
 mock = {'cell_deps': [], 'header_deps': [], 'inputs': []}
 deps = tx.raw.cell_deps.copy()
-for e in [e for e in tx.raw.cell_deps if e.dep_type == 1]:
-    origin = pyckb.rpc.get_transaction(f'0x{e.out_point.tx_hash.hex()}')
+dep_groups = [e for e in tx.raw.cell_deps if e.dep_type == 1]
+origins = fetch([f'0x{e.out_point.tx_hash.hex()}' for e in dep_groups])
+for e in dep_groups:
+    origin = origins[f'0x{e.out_point.tx_hash.hex()}']
     origin = pyckb.core.Transaction.rpc_decode(origin['transaction'])
     data = origin.raw.outputs_data[e.out_point.index]
     outs = pyckb.molecule.Slice(pyckb.molecule.Custom(pyckb.core.OutPoint.molecule_size())).decode(data)
     outs = [pyckb.core.OutPoint.molecule_decode(e) for e in outs]
     deps.extend([pyckb.core.CellDep(e, 0) for e in outs])
+origins = fetch([f'0x{e.out_point.tx_hash.hex()}' for e in deps] +
+                [f'0x{e.previous_output.tx_hash.hex()}' for e in tx.raw.inputs])
 for e in deps:
-    origin = pyckb.rpc.get_transaction(f'0x{e.out_point.tx_hash.hex()}')
+    origin = origins[f'0x{e.out_point.tx_hash.hex()}']
     header = origin['tx_status']['block_hash']
     origin = pyckb.core.Transaction.rpc_decode(origin['transaction'])
     output = origin.raw.outputs[e.out_point.index]
@@ -48,11 +67,12 @@ for e in deps:
         'data': f'0x{data.hex()}',
         'output': output.rpc(),
     })
-for h in tx.raw.header_deps:
-    header = pyckb.rpc.get_header(f'0x{h.hex()}')
+for header in pyckb.rpc.batch_cache([('get_header', [f'0x{h.hex()}']) for h in tx.raw.header_deps], pyckb.rpc.known):
+    if isinstance(header, Exception):
+        raise header
     mock['header_deps'].append(header)
 for e in tx.raw.inputs:
-    origin = pyckb.rpc.get_transaction(f'0x{e.previous_output.tx_hash.hex()}')
+    origin = origins[f'0x{e.previous_output.tx_hash.hex()}']
     header = origin['tx_status']['block_hash']
     origin = pyckb.core.Transaction.rpc_decode(origin['transaction'])
     output = origin.raw.outputs[e.previous_output.index]
@@ -1,12 +1,19 @@
+from . import arpc
 from . import bech32
+from . import cbmt
+from . import cellset
+from . import chain
 from . import config
 from . import core
+from . import dao
 from . import denomination
+from . import eaglesong
 from . import ecdsa
 from . import molecule
 from . import objectdict
 from . import rate
 from . import rpc
+from . import schema
 from . import secp256k1
 from . import unittest
 from . import wallet
@@ -0,0 +1,339 @@
+import asyncio
+import itertools
+import json
+import pyckb.config
+import pyckb.core
+import pyckb.rate
+import pyckb.rpc
+import random
+import ssl
+import typing
+import urllib.parse
+import weakref
+
+# The asyncio counterpart of pyckb.rpc. Functions have the same names, arguments and results, but must be awaited.
+# Requests go over plain asyncio streams with keep-alive connections, so no extra dependency is needed, and a single
+# process can keep hundreds of requests in flight.
+#
+# async def main():
+#     tip = await pyckb.arpc.get_tip_block_number()
+#     await asyncio.gather(*[pyckb.arpc.get_header_by_number(hex(e)) for e in range(int(tip, 16) - 256, int(tip, 16))])
+
+
+class Transport:
+    # A pooled http/1.1 transport for one endpoint. Idle connections are kept and reused between calls, at most pool
+    # connections are open at once and other requests wait for a free one.
+    def __init__(self, url: str, pool: int, timeout: tuple[float, float]) -> None:
+        u = urllib.parse.urlsplit(url)
+        assert u.scheme in ['http', 'https']
+        assert u.hostname
+        self.host = u.hostname
+        self.port = u.port or (443 if u.scheme == 'https' else 80)
+        # IPv6 addresses are bracketed in the host header.
+        self.netloc = f'[{self.host}]:{self.port}' if ':' in self.host else f'{self.host}:{self.port}'
+        self.path = (u.path or '/') + (f'?{u.query}' if u.query else '')
+        self.ssl = ssl.create_default_context() if u.scheme == 'https' else None
+        self.timeout = timeout
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.semaphore = asyncio.Semaphore(pool)
+
+    async def close(self) -> None:
+        # Close the idle connections.
+        for _, writer in self.idle:
+            writer.close()
+            await writer.wait_closed()
+        self.idle.clear()
+
+    async def connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        async with asyncio.timeout(self.timeout[0]):
+            return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def post(self, body: bytes, retry: bool = True) -> bytes:
+        async with self.semaphore:
+            # An idle connection may have been closed by the server in the meantime. The request is then sent again on
+            # a new connection. A request that is not safe to retry may have been acted on before the connection broke,
+            # so it is never sent twice: it always takes a new connection.
+            while retry and self.idle:
+                conn = self.idle.pop()
+                try:
+                    return await self.send(conn, body)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    continue
+            return await self.send(await self.connect(), body)
+
+    async def recv(self, reader: asyncio.StreamReader) -> tuple[bytes, bool]:
+        # Read a response, return the body and whether the connection can be reused. Error statuses are raised once
+        # the body is read.
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError('connection closed')
+        status = int(line.split()[1])
+        head = {}
+        for _ in itertools.repeat(0):
+            line = await reader.readline()
+            if line in [b'\r\n', b'\n', b'']:
+                break
+            k, v = line.decode('latin-1').split(':', 1)
+            head[k.strip().lower()] = v.strip().lower()
+        keep = head.get('connection') != 'close'
+        # Chunked is the last of the listed codings, if it is used at all.
+        if head.get('transfer-encoding', '').split(',')[-1].strip() == 'chunked':
+            body = bytearray()
+            for _ in itertools.repeat(0):
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    break
+                body.extend(await reader.readexactly(size))
+                await reader.readexactly(2)
+            # Skip the trailers.
+            while (await reader.readline()) not in [b'\r\n', b'\n', b'']:
+                pass
+            data = bytes(body)
+        elif 'content-length' in head:
+            data = await reader.readexactly(int(head['content-length']))
+        else:
+            data, keep = await reader.read(), False
+        if status >= 400:
+            raise Exception(f'rpc: http {status}: {data[:256]!r}')
+        return data, keep
+
+    async def send(self, conn: tuple[asyncio.StreamReader, asyncio.StreamWriter], body: bytes) -> bytes:
+        reader, writer = conn
+        try:
+            writer.write(b''.join([
+                f'POST {self.path} HTTP/1.1\r\n'.encode(),
+                f'Host: {self.netloc}\r\n'.encode(),
+                b'Content-Type: application/json\r\n',
+                f'Content-Length: {len(body)}\r\n'.encode(),
+                b'\r\n',
+                body,
+            ]))
+            async with asyncio.timeout(self.timeout[1]):
+                await writer.drain()
+                data, keep = await self.recv(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if keep:
+            self.idle.append(conn)
+        else:
+            writer.close()
+        return data
+
+
+# Streams and semaphores are bound to the event loop they are created in, so each loop gets its own transports.
+transports: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, Transport]] = weakref.WeakKeyDictionary()
+
+
+def transport() -> Transport:
+    # The transport of the current endpoint in the running event loop.
+    conf = pyckb.config.current.rpc
+    table = transports.setdefault(asyncio.get_running_loop(), {})
+    t = table.get(conf.url)
+    if t is None:
+        t = table.setdefault(conf.url, Transport(conf.url, conf.pool, tuple(conf.timeout)))
+    return t
+
+
+# Methods that change the state of the node. Their requests are never sent twice, see Transport.post.
+writes = ['send_transaction']
+
+
+async def throttle(n: int = 1) -> None:
+    # All requests share a single rate limiter. A batch request takes one token per call.
+    if not hasattr(call, 'rate'):
+        setattr(call, 'rate', pyckb.rate.AsyncLimits(pyckb.config.current.rpc.qps, 1))
+    await getattr(call, 'rate').wait(n)
+
+
+async def call(method: str, params: list) -> typing.Any:
+    return await call_dumps(method, [json.dumps(e).encode() for e in params])
+
+
+async def call_dumps(method: str, params: list[bytes]) -> typing.Any:
+    # Same as pyckb.rpc.call_dumps.
+    await throttle()
+    rid = random.randint(0x00000000, 0xffffffff)
+    body = b''.join([
+        b'{"id":%d,"jsonrpc":"2.0","method":"%s","params":[' % (rid, method.encode()),
+        b','.join(params),
+        b']}',
+    ])
+    r = pyckb.rpc.loads(await transport().post(body, method not in writes))
+    if 'error' in r:
+        raise Exception(r['error'])
+    return r['result']
+
+
+async def batch(calls: list[tuple[str, list]]) -> list[typing.Any]:
+    # Same as pyckb.rpc.batch.
+    if not calls:
+        return []
+    await throttle(len(calls))
+    r = pyckb.rpc.loads(await transport().post(json.dumps([{
+        'id': i,
+        'jsonrpc': '2.0',
+        'method': method,
+        'params': params,
+    } for i, (method, params) in enumerate(calls)]).encode(), all([e[0] not in writes for e in calls])))
+    if isinstance(r, dict):
+        raise Exception(r['error'])
+    result: list[typing.Any] = [Exception(f'rpc: missing response for id {i}') for i in range(len(calls))]
+    for e in r:
+        # A response with an id that was not sent is skipped, its call then reports a missing response.
+        i = e.get('id')
+        if type(i) is not int or not 0 <= i < len(calls):
+            continue
+        result[i] = Exception(e['error']) if 'error' in e else e['result']
+    return result
+
+
+async def wait(hash: str) -> None:
+    # Poll until the transaction is committed. Unlike pyckb.rpc.wait, it sleeps between polls, so other tasks keep
+    # running.
+    for _ in itertools.repeat(0):
+        r = await get_transaction(hash)
+        if r['tx_status']['status'] == 'committed':
+            break
+        await asyncio.sleep(1)
+
+
+async def calculate_dao_maximum_withdraw(out_point: dict, kind: str) -> str:
+    return await call('calculate_dao_maximum_withdraw', [out_point, kind])
+
+
+async def get_block(block_hash: str) -> dict:
+    return await call('get_block', [block_hash])
+
+
+async def get_block_by_number(block_number: str) -> dict:
+    return await call('get_block_by_number', [block_number])
+
+
+async def get_block_by_number_decode(block_number: str) -> pyckb.core.Block | pyckb.core.BlockV1:
+    return pyckb.rpc.block_decode(await call('get_block_by_number', [block_number, '0x0']))
+
+
+async def get_block_by_number_lazy(block_number: str) -> pyckb.core.BlockLazy:
+    return pyckb.core.BlockLazy(bytearray.fromhex((await call('get_block_by_number', [block_number, '0x0']))[2:]))
+
+
+async def get_block_decode(block_hash: str) -> pyckb.core.Block | pyckb.core.BlockV1:
+    return pyckb.rpc.block_decode(await call('get_block', [block_hash, '0x0']))
+
+
+async def get_block_lazy(block_hash: str) -> pyckb.core.BlockLazy:
+    return pyckb.core.BlockLazy(bytearray.fromhex((await call('get_block', [block_hash, '0x0']))[2:]))
+
+
+async def get_cells(search_key: dict, order: str, limit: str, after: str | None) -> dict:
+    return await call('get_cells', [search_key, order, limit, after])
+
+
+async def get_cells_decode(
+    search_key: dict,
+    order: str,
+    limit: str,
+    after: str | None,
+    interner: pyckb.core.Interner | None = None,
+) -> dict:
+    r = await get_cells(search_key, order, limit, after)
+    r['objects'] = [pyckb.rpc.cell_decode(e, interner) for e in r['objects']]
+    return r
+
+
+async def get_cells_capacity(search_key: dict) -> dict:
+    return await call('get_cells_capacity', [search_key])
+
+
+async def get_cells_iter(search_key: dict) -> typing.AsyncGenerator:
+    cursor = None
+    limits = 256
+    for _ in itertools.repeat(0):
+        r = await get_cells(search_key, 'asc', hex(limits), cursor)
+        cursor = r['last_cursor']
+        for e in r['objects']:
+            yield e
+        if len(r['objects']) < limits:
+            break
+
+
+async def get_current_epoch() -> dict:
+    return await call('get_current_epoch', [])
+
+
+async def get_header(block_hash: str) -> dict:
+    return await call('get_header', [block_hash])
+
+
+async def get_header_by_number(block_number: str) -> dict:
+    return await call('get_header_by_number', [block_number])
+
+
+async def get_header_by_number_decode(block_number: str) -> pyckb.core.Header:
+    r = await call('get_header_by_number', [block_number, '0x0'])
+    return pyckb.core.Header.molecule_decode(bytearray.fromhex(r[2:]))
+
+
+async def get_header_decode(block_hash: str) -> pyckb.core.Header:
+    return pyckb.core.Header.molecule_decode(bytearray.fromhex((await call('get_header', [block_hash, '0x0']))[2:]))
+
+
+async def get_headers_batch(block_hashes: list[str]) -> list[pyckb.core.Header | None | Exception]:
+    r = await batch([('get_header', [e, '0x0']) for e in block_hashes])
+    return [e if e is None or isinstance(e, Exception) else pyckb.core.Header.molecule_decode(
+        bytearray.fromhex(e[2:])) for e in r]
+
+
+async def get_indexer_tip() -> dict:
+    return await call('get_indexer_tip', [])
+
+
+async def get_tip_block_number() -> str:
+    return await call('get_tip_block_number', [])
+
+
+async def get_tip_header() -> dict:
+    return await call('get_tip_header', [])
+
+
+async def get_transaction(tx_hash: str) -> dict:
+    return await call('get_transaction', [tx_hash])
+
+
+async def get_transaction_decode(tx_hash: str) -> dict:
+    r = await call('get_transaction', [tx_hash, '0x0'])
+    if r['transaction']:
+        r['transaction'] = pyckb.core.Transaction.molecule_decode(bytearray.fromhex(r['transaction'][2:]))
+    return r
+
+
+async def get_transactions_batch(tx_hashes: list[str]) -> list[dict | Exception]:
+    r = await batch([('get_transaction', [e, '0x0']) for e in tx_hashes])
+    for e in r:
+        if isinstance(e, Exception) or not e['transaction']:
+            continue
+        e['transaction'] = pyckb.core.Transaction.molecule_decode(bytearray.fromhex(e['transaction'][2:]))
+    return r
+
+
+async def get_transaction_and_witness_proof(tx_hashes: list[str], block_hash: str | None) -> dict:
+    return await call('get_transaction_and_witness_proof', [tx_hashes, block_hash])
+
+
+async def get_transaction_proof(tx_hashes: list[str], block_hash: str | None) -> dict:
+    return await call('get_transaction_proof', [tx_hashes, block_hash])
+
+
+async def send_transaction(transaction: dict | pyckb.core.Transaction) -> str:
+    if isinstance(transaction, pyckb.core.Transaction):
+        return await call_dumps('send_transaction', [transaction.rpc_dumps(), b'"passthrough"'])
+    return await call('send_transaction', [transaction, 'passthrough'])
+
+
+async def verify_transaction_and_witness_proof(tx_proof: dict) -> list[str]:
+    return await call('verify_transaction_and_witness_proof', [tx_proof])
+
+
+async def verify_transaction_proof(tx_proof: dict) -> list[str]:
+    return await call('verify_transaction_proof', [tx_proof])
@@ -0,0 +1,151 @@
+# Doc: https://github.com/nervosnetwork/merkle-tree
+#
+# Complete binary merkle tree. The n leaves are stored at the end of an array of 2n - 1 nodes and every other node is
+# the merge of its two children, so node i has children 2i + 1 and 2i + 2 and the root is node 0. A block commits to
+# its transactions with transactions_root = merge(root(tx hashes), root(tx witness hashes)).
+import json
+import pyckb.core
+import typing
+
+
+def merge(a: bytearray, b: bytearray) -> bytearray:
+    return pyckb.core.hash(a + b)
+
+
+def parent(i: int) -> int:
+    return (i - 1) >> 1
+
+
+def sibling(i: int) -> int:
+    return ((i + 1) ^ 1) - 1
+
+
+class Proof:
+    # A proof for several leaves at once. The indices are node indices, ordered the same way as the sorted leaves they
+    # prove, and the lemmas are the nodes needed to rebuild the root. This is the format used by the ckb rpc.
+    def __init__(self, indices: list[int], lemmas: list[bytearray]) -> None:
+        self.indices = indices
+        self.lemmas = lemmas
+
+    def __eq__(self, other: object) -> bool:
+        assert isinstance(other, Proof)
+        return all([
+            self.indices == other.indices,
+            self.lemmas == other.lemmas,
+        ])
+
+    def __repr__(self) -> str:
+        return json.dumps(self.json())
+
+    def json(self) -> dict:
+        return {
+            'indices': self.indices,
+            'lemmas': [e.hex() for e in self.lemmas],
+        }
+
+    def root(self, leaves: list[bytearray]) -> bytearray | None:
+        # Rebuild the root from the proved leaves, in any order. Return None if the proof does not fit the leaves.
+        if len(leaves) != len(self.indices) or len(leaves) == 0:
+            return None
+        queue = sorted(zip(self.indices, sorted(leaves)), key=lambda e: e[0], reverse=True)
+        lemmas = iter(self.lemmas)
+        head = 0
+        while head < len(queue):
+            i, node = queue[head]
+            head += 1
+            if i == 0:
+                # All leaves and lemmas must have been used.
+                if head == len(queue) and next(lemmas, None) is None:
+                    return node
+                return None
+            if head < len(queue) and queue[head][0] == sibling(i):
+                other = queue[head][1]
+                head += 1
+            else:
+                other = next(lemmas, None)
+                if other is None:
+                    return None
+            queue.append((parent(i), merge(node, other) if i & 1 else merge(other, node)))
+        return None
+
+    def rpc(self) -> dict:
+        return {
+            'indices': [hex(e) for e in self.indices],
+            'lemmas': [f'0x{e.hex()}' for e in self.lemmas],
+        }
+
+    @classmethod
+    def rpc_decode(cls, data: dict) -> Proof:
+        return Proof(
+            [int(e, 16) for e in data['indices']],
+            [bytearray.fromhex(e[2:]) for e in data['lemmas']],
+        )
+
+
+class Tree:
+    # Build the whole tree once, then take the root or any number of proofs from it.
+    def __init__(self, leaves: list[bytearray]) -> None:
+        self.nodes: list[bytearray] = [bytearray()] * max(len(leaves) - 1, 0) + list(leaves)
+        for i in range(len(leaves) - 2, -1, -1):
+            self.nodes[i] = merge(self.nodes[2 * i + 1], self.nodes[2 * i + 2])
+
+    def proof(self, leaves: list[int]) -> Proof:
+        # Build a single proof for the leaves at the given positions.
+        assert len(leaves) > 0
+        size = (len(self.nodes) >> 1) + 1
+        assert all([0 <= e < size for e in leaves])
+        indices = sorted([size - 1 + e for e in leaves], reverse=True)
+        lemmas = []
+        queue = list(indices)
+        head = 0
+        while head < len(queue):
+            i = queue[head]
+            head += 1
+            if i == 0:
+                break
+            if head < len(queue) and queue[head] == sibling(i):
+                head += 1
+            else:
+                lemmas.append(self.nodes[sibling(i)])
+            if parent(i) != 0:
+                queue.append(parent(i))
+        indices.sort(key=lambda e: self.nodes[e])
+        return Proof(indices, lemmas)
+
+    def root(self) -> bytearray:
+        if len(self.nodes) == 0:
+            return bytearray(32)
+        return self.nodes[0]
+
+
+def root(leaves: list[bytearray]) -> bytearray:
+    # The root of the tree, an empty tree has a root of zeros.
+    return Tree(leaves).root()
+
+
+def transactions_root(txs_hash: list[bytearray], witnesses_hash: list[bytearray]) -> bytearray:
+    return merge(root(txs_hash), root(witnesses_hash))
+
+
+def transactions_root_block(block: typing.Any) -> bytearray:
+    # Compute the transactions root of a Block, BlockV1 or BlockLazy. Hashes memoized by frozen transactions are
+    # reused, and a lazy block hashes its serialized transactions without decoding them.
+    if isinstance(block, pyckb.core.BlockLazy):
+        txs = list(block.transactions.slices())
+        return transactions_root(
+            [pyckb.core.Transaction.peek_hash(e) for e in txs],
+            [pyckb.core.hash(e) for e in txs],
+        )
+    return transactions_root(
+        [e.raw.hash() for e in block.transactions],
+        [e.hash_witness() for e in block.transactions],
+    )
+
+
+def verify(proof: Proof, witnesses_root: bytearray, transactions_root: bytearray, txs_hash: list[bytearray]) -> bool:
+    # Check that the transactions are committed in a block with the given transactions root. This is what the ckb rpc
+    # verify_transaction_proof does, but it runs locally against a cached header.
+    raw_root = proof.root(txs_hash)
+    if raw_root is None:
+        return False
+    return merge(raw_root, witnesses_root) == transactions_root
@@ -0,0 +1,108 @@
+import array
+import pyckb.core
+import typing
+
+
+class Cell:
+    # Define a class to represent a ckb cell, which is a basic unit of data storage in the ckb blockchain.
+    __slots__ = ['out_point', 'cell_output', 'data']
+
+    def __init__(self, out_point: pyckb.core.OutPoint, cell_output: pyckb.core.CellOutput, data: bytearray) -> None:
+        self.out_point = out_point
+        self.cell_output = cell_output
+        self.data = data
+
+
+class CellSet:
+    # A compact set of live cells. Out points are packed into a single bytearray, capacities into an array of u64 and
+    # lock and type scripts are stored once and referred to by index. With the out point index, a cell costs about
+    # two hundred bytes instead of a few kilobytes of python objects. Only non-empty cell data is kept. Cells are
+    # removed by moving the last cell into the hole, so the slots stay dense and every operation except ordering is
+    # O(1). Scripts are pooled by an interner, pass the one used to decode the cells to share their scripts.
+    def __init__(self, interner: pyckb.core.Interner | None = None) -> None:
+        self.out_points = bytearray()
+        self.capacities = array.array('Q')
+        # Index 0 stands for no script.
+        self.locks = array.array('I')
+        self.kypes = array.array('I')
+        self.datas: dict[int, bytes] = {}
+        self.scripts: list[pyckb.core.Script | None] = [None]
+        self.scripts_index: dict[bytes, int] = {}
+        self.index: dict[bytes, int] = {}
+        self.interner = interner if interner is not None else pyckb.core.Interner()
+        self.total = 0
+
+    def __contains__(self, out_point: pyckb.core.OutPoint) -> bool:
+        return bytes(out_point.data) in self.index
+
+    def __getitem__(self, out_point: pyckb.core.OutPoint) -> Cell:
+        return self.cell(self.index[bytes(out_point.data)])
+
+    def __iter__(self) -> typing.Iterator[Cell]:
+        for i in range(len(self)):
+            yield self.cell(i)
+
+    def __len__(self) -> int:
+        return len(self.capacities)
+
+    def add(self, out_point: pyckb.core.OutPoint, cell_output: pyckb.core.CellOutput, data: bytearray) -> None:
+        key = bytes(out_point.data)
+        assert key not in self.index
+        i = len(self)
+        self.index[key] = i
+        self.out_points.extend(key)
+        self.capacities.append(cell_output.capacity)
+        self.locks.append(self.script_intern(cell_output.lock))
+        self.kypes.append(self.script_intern(cell_output.kype))
+        if data:
+            self.datas[i] = bytes(data)
+        self.total += cell_output.capacity
+
+    def capacity(self) -> int:
+        # The sum of the capacities of all cells.
+        return self.total
+
+    def cell(self, i: int) -> Cell:
+        out_point = pyckb.core.OutPoint.molecule_decode(bytearray(self.out_points[i * 36:i * 36 + 36]))
+        lock = self.scripts[self.locks[i]]
+        assert lock is not None
+        cell_output = pyckb.core.CellOutput(self.capacities[i], lock, self.scripts[self.kypes[i]])
+        return Cell(out_point, cell_output, bytearray(self.datas.get(i, b'')))
+
+    def order(self, reverse: bool = False) -> typing.Generator[Cell]:
+        # Iterate the cells in capacity order, the smallest first. Cells are built lazily, so taking the first few of a
+        # large set only costs the sort.
+        for i in sorted(range(len(self)), key=self.capacities.__getitem__, reverse=reverse):
+            yield self.cell(i)
+
+    def remove(self, out_point: pyckb.core.OutPoint) -> None:
+        i = self.index.pop(bytes(out_point.data))
+        j = len(self) - 1
+        self.total -= self.capacities[i]
+        self.datas.pop(i, None)
+        if i != j:
+            key = bytes(self.out_points[j * 36:j * 36 + 36])
+            self.index[key] = i
+            self.out_points[i * 36:i * 36 + 36] = key
+            self.capacities[i] = self.capacities[j]
+            self.locks[i] = self.locks[j]
+            self.kypes[i] = self.kypes[j]
+            if j in self.datas:
+                self.datas[i] = self.datas.pop(j)
+        del self.out_points[j * 36:]
+        self.capacities.pop()
+        self.locks.pop()
+        self.kypes.pop()
+
+    def script_intern(self, script: pyckb.core.Script | None) -> int:
+        if script is None:
+            return 0
+        i = self.scripts_index.get(script.data)
+        if i is None:
+            # The interner freezes the scripts it pools, a mutable script of the caller is copied first.
+            if not script.frozen():
+                script = pyckb.core.Script.molecule_decode(bytearray(script.data))
+            i = len(self.scripts)
+            self.scripts_index[script.data] = i
+            self.scripts.append(self.interner.script(script))
+        return i
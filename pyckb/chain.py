@@ -0,0 +1,72 @@
+# Doc: https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0020-ckb-consensus-protocol/0020-ckb-consensus-protocol.md
+#
+# Offline validation of header chains, so that headers fetched in bulk from an untrusted source can be checked before
+# they are cached. The proof of work function defaults to eaglesong, which ckb mainnet uses to map the 48 bytes pow
+# message to 32 bytes. Another one can be passed in, for example a faster native implementation.
+import concurrent.futures
+import itertools
+import pyckb.core
+import pyckb.eaglesong
+import typing
+
+
+def compact_to_target(compact: int) -> int:
+    # The compact target is a 3 bytes mantissa and a 1 byte exponent, in the same format as bitcoin's nBits.
+    # A target is 256 bits, so the exponent can't exceed 32 bytes.
+    exponent = compact >> 24
+    mantissa = compact & 0xffffff
+    assert exponent <= 32
+    if exponent <= 3:
+        return mantissa >> 8 * (3 - exponent)
+    return mantissa << 8 * (exponent - 3)
+
+
+def pow_message(header: pyckb.core.Header) -> bytearray:
+    return header.raw.hash() + bytearray(header.nonce.to_bytes(16, 'little'))
+
+
+def verify_epoch(parent: int, epoch: int) -> bool:
+    # The child is either the next block of the same epoch, or the first block of the next epoch.
+    pe, pi, pl = pyckb.core.epoch_decode(parent)
+    e, i, l = pyckb.core.epoch_decode(epoch)
+    if pi + 1 < pl:
+        return (e, i, l) == (pe, pi + 1, pl)
+    return e == pe + 1 and i == 0 and l > 0
+
+
+def verify_link(parent: pyckb.core.Header, header: pyckb.core.Header) -> bool:
+    return all([
+        header.raw.parent_hash == parent.hash(),
+        header.raw.number == parent.raw.number + 1,
+        verify_epoch(parent.raw.epoch, header.raw.epoch),
+    ])
+
+
+def verify_pow(
+    header: pyckb.core.Header,
+    pow: typing.Callable[[bytearray], bytearray] = pyckb.eaglesong.eaglesong,
+) -> bool:
+    # The pow output, read as a big endian integer, must not exceed the target.
+    target = compact_to_target(header.raw.compact_target)
+    if target == 0:
+        return False
+    return int.from_bytes(pow(pow_message(header))) <= target
+
+
+def verify(
+    headers: list[pyckb.core.Header],
+    pow: typing.Callable[[bytearray], bytearray] = pyckb.eaglesong.eaglesong,
+    parent: pyckb.core.Header | None = None,
+    processes: int = 0,
+) -> bool:
+    # Check that the headers form a chain, following a trusted parent if one is given. The links are cheap and are
+    # checked first. The proof of work is then checked in this process, or across a process pool of the given size. The
+    # pow function must then be picklable, like any module level function.
+    chain = headers if parent is None else [parent] + headers
+    if not all([verify_link(a, b) for a, b in itertools.pairwise(chain)]):
+        return False
+    if processes == 0:
+        return all([verify_pow(e, pow) for e in headers])
+    chunksize = max(1, len(headers) // (processes * 4))
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        return all(executor.map(verify_pow, headers, itertools.repeat(pow), chunksize=chunksize))
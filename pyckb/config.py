@@ -9,6 +9,9 @@ develop = pyckb.objectdict.ObjectDict({
         'url': 'http://127.0.0.1:8114',
         # Rate limit per second.
         'qps': 32,
+        # Connections kept alive, and the connect and read timeouts in seconds.
+        'pool': 16,
+        'timeout': [4, 64],
     },
     'script': {
         'dao': {
@@ -53,6 +56,8 @@ mainnet = pyckb.objectdict.ObjectDict({
         # https://github.com/nervosnetwork/ckb/wiki/Public-JSON-RPC-nodes
         'url': 'https://mainnet.ckbapp.dev',
         'qps': 4,
+        'pool': 4,
+        'timeout': [8, 64],
     },
     'script': {
         'dao': {
@@ -97,6 +102,8 @@ testnet = pyckb.objectdict.ObjectDict({
         # https://github.com/nervosnetwork/ckb/wiki/Public-JSON-RPC-nodes
         'url': 'https://testnet.ckbapp.dev',
         'qps': 4,
+        'pool': 4,
+        'timeout': [8, 64],
     },
     'script': {
         'dao': {
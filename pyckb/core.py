@@ -1,3 +1,7 @@
+import binascii
+import builtins
+import collections.abc
+import functools
 import hashlib
 import json
 import pyckb.bech32
@@ -7,6 +11,7 @@ import pyckb.molecule
 import pyckb.objectdict
 import pyckb.secp256k1
 import secrets
+import typing
 
 # https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0022-transaction-structure/0022-transaction-structure.md
 # The Type ID code cell uses a special type script hash, which is just the ascii codes in hex of the text TYPE_ID.
@@ -24,6 +29,74 @@ def hash(data: bytearray) -> bytearray:
     return bytearray(hashlib.blake2b(data, digest_size=32, person=b'ckb-default-hash').digest())
 
 
+def memoize(f: typing.Callable) -> typing.Callable:
+    # Mark a method returning bytes to be cached on frozen records, see Frozen. The method itself is left as is, only
+    # the frozen variant of the class calls it through memoize_wrap.
+    setattr(f, 'memoize', True)
+    return f
+
+
+def memoize_wrap(f: typing.Callable) -> typing.Callable:
+    name = f.__name__
+
+    @functools.wraps(f)
+    def wrap(self: Frozen) -> bytearray:
+        memo = self.memo
+        if name not in memo:
+            memo[name] = bytes(f(self))
+        return bytearray(memo[name])
+    return wrap
+
+
+class Frozen:
+    # A record is mutable until freeze() is called. Freezing replaces mutable children with immutable ones (lists with
+    # tuples, bytearrays with bytes, records with frozen records) and switches the record to a read-only variant of its
+    # class. The serialized form and the hash are then computed once and served from the memo. Mutable records pay
+    # nothing for this: the caching wrappers and the __setattr__ hook only exist on the frozen variant.
+    __slots__ = ['memo']
+
+    def __reduce__(self) -> tuple:
+        # Pickle through the molecule encoding, a single bytes object is much smaller and faster to transfer than the
+        # object graph. The frozen variant of a class is created at runtime, so the base class is pickled instead.
+        kype = type(self).__base__ if self.frozen() else type(self)
+        return (unpickle, (kype, bytes(self.molecule()), self.frozen()))
+
+    def freeze(self) -> typing.Self:
+        if not self.frozen():
+            self.memo = {}
+            self.__class__ = frozen_class(type(self))
+        return self
+
+    def frozen(self) -> bool:
+        return type(self).__setattr__ is frozen_setattr
+
+
+def frozen_setattr(self: Frozen, name: str, value: typing.Any) -> None:
+    assert False, f'{type(self).__name__} is frozen'
+
+
+@functools.cache
+def frozen_class(cls: type) -> type:
+    # The subclass adds no slots, so it has the same layout as cls and an instance can switch to it. Methods marked
+    # with memoize are replaced by their caching wrappers.
+    attr = {
+        '__module__': cls.__module__,
+        '__qualname__': cls.__qualname__,
+        '__setattr__': frozen_setattr,
+        '__slots__': [],
+    }
+    for name in dir(cls):
+        e = getattr(cls, name)
+        if getattr(e, 'memoize', False):
+            attr[name] = memoize_wrap(e)
+    return type(cls.__name__, (cls,), attr)
+
+
+def unpickle(kype: type, data: bytes, frozen: bool) -> Frozen:
+    r = kype.molecule_decode(bytearray(data))
+    return r.freeze() if frozen else r
+
+
 class PriKey:
     def __init__(self, n: int) -> None:
         self.n = n
@@ -120,7 +193,30 @@ class PubKey:
         return PubKey(x, y)
 
 
-class Script:
+@functools.lru_cache(maxsize=1 << 16)
+def addr_encode(hrp: str, data: bytes) -> str:
+    # Encode the serialized script as a full version address. Services render the same addresses over and over, so
+    # the result is kept in a bounded cache.
+    payload = bytearray()
+    payload.append(0x00)
+    payload.extend(data[16:49])
+    payload.extend(data[53:])
+    return pyckb.bech32.encode_addr(hrp, payload)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def addr_payload(hrp: str, ver: int, data: str) -> bytes:
+    # Decode the payload of an address, with the checksum of the given bech32 version. The payload does not depend on
+    # the network config, only the hrp, so it can be cached. Invalid addresses raise and are not cached.
+    return bytes(pyckb.bech32.re_arrange_8(pyckb.bech32.decode(hrp, ver, data)))
+
+
+class Script(Frozen):
+    # A script is stored as its serialized form in an immutable bytes object. Fields are decoded on access, assigning a
+    # field re-encodes the script. The args and the code_hash are returned as bytes, so an attempt to modify them in
+    # place raises instead of being lost.
+    __slots__ = ['data']
+
     def __init__(self, code_hash: bytearray, hash_type: int, args: bytearray) -> None:
         assert len(code_hash) == 32
         assert hash_type in [
@@ -129,38 +225,58 @@ class Script:
             script_hash_type_data1,
             script_hash_type_data2,
         ]
-        self.code_hash = code_hash
-        self.hash_type = hash_type
-        self.args = args
+        self.data = bytes(pyckb.molecule.Table([
+            pyckb.molecule.Byte32,
+            pyckb.molecule.Byte,
+            pyckb.molecule.Bytes,
+        ]).encode([code_hash, hash_type, args]))
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
     def __eq__(self, other: object) -> bool:
         assert isinstance(other, Script)
-        return all([
-            self.code_hash == other.code_hash,
-            self.hash_type == other.hash_type,
-            self.args == other.args,
-        ])
+        # Interned scripts are shared, so most equal scripts are the same object.
+        return self is other or self.data == other.data
+
+    def __hash__(self) -> int:
+        return builtins.hash(self.data)
+
+    @property
+    def args(self) -> bytes:
+        return self.data[53:]
+
+    @args.setter
+    def args(self, args: bytearray) -> None:
+        self.data = Script(self.code_hash, self.hash_type, args).data
+
+    @property
+    def code_hash(self) -> bytes:
+        return self.data[16:48]
+
+    @code_hash.setter
+    def code_hash(self, code_hash: bytearray) -> None:
+        self.data = Script(code_hash, self.hash_type, self.args).data
+
+    @property
+    def hash_type(self) -> int:
+        return self.data[48]
+
+    @hash_type.setter
+    def hash_type(self, hash_type: int) -> None:
+        self.data = Script(self.code_hash, hash_type, self.args).data
 
     def addr(self) -> str:
         # See: https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0021-ckb-address-format/0021-ckb-address-format.md
         # See: https://github.com/rev-chaos/ckb-address-demo/blob/master/ckb_addr_test.py
-        payload = bytearray()
-        payload.append(0x00)
-        # Append secp256k1 code hash
-        payload.extend(self.code_hash)
-        payload.append(self.hash_type)
-        payload.extend(self.args)
-        return pyckb.bech32.encode_addr(pyckb.config.current.hrp, payload)
+        return addr_encode(pyckb.config.current.hrp, bytes(self.data))
 
     @classmethod
     def addr_decode_v0(cls, data: str) -> Script:
         # Short version for locks with popular code_hash, deprecated.
         # In most cases, please use addr_decode() which can automatically detect the version.
         # See https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0021-ckb-address-format/0021-ckb-address-format.md
-        payload = pyckb.bech32.re_arrange_8(pyckb.bech32.decode(pyckb.config.current.hrp, 0, data))
+        payload = addr_payload(pyckb.config.current.hrp, 0, data)
         assert payload[0] == 0x01
         match payload[1]:
             case 0x00:
@@ -181,7 +297,7 @@ class Script:
         # Full version identifies the hash_type.
         # In most cases, please use addr_decode() which can automatically detect the version.
         # See https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0021-ckb-address-format/0021-ckb-address-format.md
-        payload = pyckb.bech32.decode_addr(pyckb.config.current.hrp, data)
+        payload = addr_payload(pyckb.config.current.hrp, 1, data)
         assert payload[0] == 0
         code_hash = payload[1:33]
         hash_type = payload[33]
@@ -195,6 +311,23 @@ class Script:
             return cls.addr_decode_v0(data)
         return cls.addr_decode_v1(data)
 
+    @classmethod
+    def addr_decode_many(cls, data: list[str]) -> list[Script | Exception]:
+        # Decode many addresses. An invalid address does not stop the batch, its error is returned in its place.
+        r: list[Script | Exception] = []
+        for e in data:
+            try:
+                r.append(cls.addr_decode(e))
+            except (AssertionError, IndexError, KeyError, ValueError) as err:
+                r.append(err)
+        return r
+
+    @classmethod
+    def addr_many(cls, scripts: list[Script]) -> list[str]:
+        hrp = pyckb.config.current.hrp
+        return [addr_encode(hrp, bytes(e.data)) for e in scripts]
+
+    @memoize
     def hash(self) -> bytearray:
         return hash(self.molecule())
 
@@ -206,20 +339,33 @@ class Script:
         }
 
     def molecule(self) -> bytearray:
-        return pyckb.molecule.Table([
-            pyckb.molecule.Byte32,
-            pyckb.molecule.Byte,
-            pyckb.molecule.Bytes,
-        ]).encode([self.code_hash, self.hash_type, self.args])
+        return bytearray(self.data)
 
     @classmethod
-    def molecule_decode(cls, data: bytearray) -> Script:
+    def molecule_decode(cls, data: bytearray, interner: Interner | None = None) -> Script:
+        if interner is not None:
+            script = interner.pool.get(bytes(data))
+            if script is not None:
+                return script
+            return interner.script(cls.molecule_decode(data))
         result = pyckb.molecule.Table([
             pyckb.molecule.Byte32,
             pyckb.molecule.Byte,
             pyckb.molecule.Bytes,
         ]).decode(data)
-        return Script(result[0], result[1], result[2])
+        # Reuse the buffer only if it is exactly what the constructor would produce.
+        assert pyckb.molecule.Split.count(data) == 3
+        assert len(data) == 53 + len(result[2])
+        assert result[1] in [
+            script_hash_type_data,
+            script_hash_type_type,
+            script_hash_type_data1,
+            script_hash_type_data2,
+        ]
+        # The base class is used, cls may be the frozen variant when called through a frozen instance.
+        script = Script.__new__(Script)
+        script.data = bytes(data)
+        return script
 
     def rpc(self) -> dict:
         return {
@@ -234,7 +380,16 @@ class Script:
         }
 
     @classmethod
-    def rpc_decode(cls, data: dict) -> Script:
+    def rpc_decode(cls, data: dict, interner: Interner | None = None) -> Script:
+        if interner is not None:
+            # Hits are found by the json strings, skipping the hex decoding.
+            key = (data['code_hash'], data['hash_type'], data['args'])
+            script = interner.pool_rpc.get(key)
+            if script is not None:
+                return script
+            script = interner.script(cls.rpc_decode(data))
+            interner.pool_rpc[key] = script
+            return script
         return Script(
             bytearray.fromhex(data['code_hash'][2:]),
             {
@@ -247,25 +402,60 @@ class Script:
         )
 
 
-class OutPoint:
+class Interner:
+    # A pool of scripts. Large cell sets use a handful of distinct scripts (the secp256k1_blake160 lock of a few
+    # addresses, dao, multisig), decoding them through an interner makes identical scripts share one frozen object.
+    # The code_hash needs no pool of its own, it is stored inside the script bytes.
+    def __init__(self) -> None:
+        self.pool: dict[bytes, Script] = {}
+        self.pool_rpc: dict[tuple[str, str, str], Script] = {}
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def script(self, script: Script) -> Script:
+        # Return the pooled script equal to the given one, the given one is frozen and pooled if there is none.
+        r = self.pool.get(script.data)
+        if r is None:
+            r = script.freeze()
+            self.pool[r.data] = r
+        return r
+
+
+class OutPoint(Frozen):
+    # An out point is stored as its 36 bytes serialized form, see Script.
+    __slots__ = ['data']
+
     def __init__(self, tx_hash: bytearray, index: int) -> None:
         assert len(tx_hash) == 32
-        self.tx_hash = tx_hash
-        self.index = index
+        self.data = bytes(tx_hash) + pyckb.molecule.U32.encode(index)
 
     def __eq__(self, other: object) -> bool:
         assert isinstance(other, OutPoint)
-        return all([
-            self.tx_hash == other.tx_hash,
-            self.index == other.index,
-        ])
+        return self.data == other.data
 
     def __hash__(self) -> int:
-        return int.from_bytes(self.molecule())
+        return builtins.hash(self.data)
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    @property
+    def index(self) -> int:
+        return int.from_bytes(self.data[32:], 'little')
+
+    @index.setter
+    def index(self, index: int) -> None:
+        self.data = OutPoint(self.tx_hash, index).data
+
+    @property
+    def tx_hash(self) -> bytes:
+        return self.data[:32]
+
+    @tx_hash.setter
+    def tx_hash(self, tx_hash: bytearray) -> None:
+        self.data = OutPoint(tx_hash, self.index).data
+
     def json(self) -> dict:
         return {
             'tx_hash': self.tx_hash.hex(),
@@ -273,18 +463,14 @@ class OutPoint:
         }
 
     def molecule(self) -> bytearray:
-        return pyckb.molecule.Struct([
-            pyckb.molecule.Byte32,
-            pyckb.molecule.U32,
-        ]).encode([self.tx_hash, self.index])
+        return bytearray(self.data)
 
     @classmethod
     def molecule_decode(cls, data: bytearray) -> OutPoint:
-        result = pyckb.molecule.Struct([
-            pyckb.molecule.Byte32,
-            pyckb.molecule.U32,
-        ]).decode(data)
-        return OutPoint(result[0], result[1])
+        assert len(data) == cls.molecule_size()
+        out_point = OutPoint.__new__(OutPoint)
+        out_point.data = bytes(data)
+        return out_point
 
     @classmethod
     def molecule_size(cls) -> int:
@@ -304,7 +490,9 @@ class OutPoint:
         )
 
 
-class CellInput:
+class CellInput(Frozen):
+    __slots__ = ['since', 'previous_output']
+
     def __init__(self, since: int, previous_output: OutPoint) -> None:
         self.since = since
         self.previous_output = previous_output
@@ -319,12 +507,18 @@ class CellInput:
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> CellInput:
+        if not self.frozen():
+            self.previous_output = self.previous_output.freeze()
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'since': self.since,
             'previous_output': self.previous_output.json()
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Struct([
             pyckb.molecule.U64,
@@ -357,7 +551,9 @@ class CellInput:
         )
 
 
-class CellOutput:
+class CellOutput(Frozen):
+    __slots__ = ['capacity', 'lock', 'kype']
+
     def __init__(self, capacity: int, lock: Script, kype: Script | None) -> None:
         self.capacity = capacity
         self.lock = lock
@@ -374,6 +570,12 @@ class CellOutput:
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> CellOutput:
+        if not self.frozen():
+            self.lock = self.lock.freeze()
+            self.kype = self.kype.freeze() if self.kype else None
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'capacity': self.capacity,
@@ -381,6 +583,7 @@ class CellOutput:
             'type': self.kype.json() if self.kype else None
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.U64,
@@ -393,7 +596,7 @@ class CellOutput:
         ])
 
     @classmethod
-    def molecule_decode(cls, data: bytearray) -> CellOutput:
+    def molecule_decode(cls, data: bytearray, interner: Interner | None = None) -> CellOutput:
         result = pyckb.molecule.Table([
             pyckb.molecule.U64,
             pyckb.molecule.Custom(0),
@@ -401,10 +604,23 @@ class CellOutput:
         ]).decode(data)
         return CellOutput(
             result[0],
-            Script.molecule_decode(result[1]),
-            Script.molecule_decode(result[2]) if result[2] else None
+            Script.molecule_decode(result[1], interner),
+            Script.molecule_decode(result[2], interner) if result[2] else None
         )
 
+    @classmethod
+    def peek_capacity(cls, data: bytearray) -> int:
+        return pyckb.molecule.U64.decode(pyckb.molecule.Split.index(data, 0))
+
+    @classmethod
+    def peek_lock(cls, data: bytearray) -> Script:
+        return Script.molecule_decode(pyckb.molecule.Split.index(data, 1))
+
+    @classmethod
+    def peek_lock_hash(cls, data: bytearray) -> bytearray:
+        # The lock field is the serialized lock script, so it can be hashed as is.
+        return hash(pyckb.molecule.Split.index(data, 1))
+
     def rpc(self) -> dict:
         return {
             'capacity': hex(self.capacity),
@@ -413,15 +629,17 @@ class CellOutput:
         }
 
     @classmethod
-    def rpc_decode(cls, data: dict) -> CellOutput:
+    def rpc_decode(cls, data: dict, interner: Interner | None = None) -> CellOutput:
         return CellOutput(
             int(data['capacity'], 16),
-            Script.rpc_decode(data['lock']),
-            Script.rpc_decode(data['type']) if data['type'] else None,
+            Script.rpc_decode(data['lock'], interner),
+            Script.rpc_decode(data['type'], interner) if data['type'] else None,
         )
 
 
-class CellDep:
+class CellDep(Frozen):
+    __slots__ = ['out_point', 'dep_type']
+
     def __init__(self, out_point: OutPoint, dep_type: int) -> None:
         self.out_point = out_point
         self.dep_type = dep_type
@@ -440,12 +658,18 @@ class CellDep:
     def conf_decode(cls, data: pyckb.objectdict.ObjectDict) -> CellDep:
         return CellDep(OutPoint(data.out_point.tx_hash, data.out_point.index), data.dep_type)
 
+    def freeze(self) -> CellDep:
+        if not self.frozen():
+            self.out_point = self.out_point.freeze()
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'out_point': self.out_point.json(),
             'dep_type': self.dep_type,
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Struct([
             pyckb.molecule.Custom(OutPoint.molecule_size()),
@@ -481,7 +705,9 @@ class CellDep:
         )
 
 
-class RawTransaction:
+class RawTransaction(Frozen):
+    __slots__ = ['version', 'cell_deps', 'header_deps', 'inputs', 'outputs', 'outputs_data']
+
     def __init__(
         self,
         version: int,
@@ -502,16 +728,26 @@ class RawTransaction:
         assert isinstance(other, RawTransaction)
         return all([
             self.version == other.version,
-            self.cell_deps == other.cell_deps,
-            self.header_deps == other.header_deps,
-            self.inputs == other.inputs,
-            self.outputs == other.outputs,
-            self.outputs_data == other.outputs_data,
+            list(self.cell_deps) == list(other.cell_deps),
+            list(self.header_deps) == list(other.header_deps),
+            list(self.inputs) == list(other.inputs),
+            list(self.outputs) == list(other.outputs),
+            list(self.outputs_data) == list(other.outputs_data),
         ])
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> RawTransaction:
+        if not self.frozen():
+            self.cell_deps = tuple([e.freeze() for e in self.cell_deps])
+            self.header_deps = tuple([bytes(e) for e in self.header_deps])
+            self.inputs = tuple([e.freeze() for e in self.inputs])
+            self.outputs = tuple([e.freeze() for e in self.outputs])
+            self.outputs_data = tuple([bytes(e) for e in self.outputs_data])
+        return super().freeze()
+
+    @memoize
     def hash(self) -> bytearray:
         return hash(self.molecule())
 
@@ -525,6 +761,7 @@ class RawTransaction:
             'outputs_data': [e.hex() for e in self.outputs_data],
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.U32,
@@ -583,7 +820,9 @@ class RawTransaction:
         )
 
 
-class Transaction:
+class Transaction(Frozen):
+    __slots__ = ['raw', 'witnesses']
+
     def __init__(self, raw: RawTransaction, witnesses: list[bytearray]) -> None:
         self.raw = raw
         self.witnesses = witnesses
@@ -592,16 +831,22 @@ class Transaction:
         assert isinstance(other, Transaction)
         return all([
             self.raw == other.raw,
-            self.witnesses == other.witnesses,
+            list(self.witnesses) == list(other.witnesses),
         ])
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> Transaction:
+        if not self.frozen():
+            self.raw = self.raw.freeze()
+            self.witnesses = tuple([bytes(e) for e in self.witnesses])
+        return super().freeze()
+
     def hash_sighash_all(self, major: int, other: list[int]) -> bytearray:
-        lock = WitnessArgs.molecule_decode(self.witnesses[major]).lock
+        lock = WitnessArgs.peek_lock(self.witnesses[major])
         assert lock is not None
-        assert all([e == 0 for e in lock])
+        assert not any(lock)
         major_w = self.witnesses[major]
         major_l = len(major_w)
         b = bytearray()
@@ -619,11 +864,48 @@ class Transaction:
             b.extend(e)
         return hash(b)
 
+    def hash_sighash_all_group(self, cells: list[CellOutput]) -> list[tuple[int, list[int], bytearray]]:
+        # Compute the sighash_all message of every lock group in one pass. The cells are the resolved input cells, in
+        # the order of the inputs. Groups are returned in the order of their first input as (major, other, message),
+        # where each message is what hash_sighash_all(major, other) returns. The raw hash and the trailing witnesses
+        # are processed once: every group resumes from a copy of the hasher state.
+        assert len(cells) == len(self.raw.inputs)
+        group: dict[bytes, list[int]] = {}
+        for i, e in enumerate(cells):
+            # Two locks have the same hash if and only if they have the same serialized form.
+            group.setdefault(bytes(e.lock.data), []).append(i)
+        head = hashlib.blake2b(digest_size=32, person=b'ckb-default-hash')
+        head.update(self.raw.hash())
+        tail = bytearray()
+        for e in self.witnesses[len(self.raw.inputs):]:
+            tail.extend(len(e).to_bytes(8, 'little'))
+            tail.extend(e)
+        r = []
+        for g in group.values():
+            major = g[0]
+            other = g[1:]
+            lock = WitnessArgs.peek_lock(self.witnesses[major])
+            assert lock is not None
+            assert not any(lock)
+            h = head.copy()
+            for i in [major] + [i for i in other if i < len(self.witnesses)]:
+                h.update(len(self.witnesses[i]).to_bytes(8, 'little'))
+                h.update(self.witnesses[i])
+            h.update(tail)
+            r.append((major, other, bytearray(h.digest())))
+        return r
+
+    @memoize
+    def hash_witness(self) -> bytearray:
+        # The witness hash covers the whole transaction, it is the leaf of the witnesses root of a block.
+        return hash(self.molecule())
+
     def json(self) -> dict:
         r = self.raw.json()
         r['witnesses'] = [e.hex() for e in self.witnesses]
         return r
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.Custom(0),
@@ -641,11 +923,115 @@ class Transaction:
             result[1],
         )
 
+    @classmethod
+    def peek_hash(cls, data: bytearray) -> bytearray:
+        # The transaction hash is the hash of the serialized raw transaction.
+        return hash(cls.peek_raw(data))
+
+    @classmethod
+    def peek_outputs(cls, data: bytearray) -> list[CellOutput]:
+        outputs = pyckb.molecule.Split.index(cls.peek_raw(data), 4)
+        return [CellOutput.molecule_decode(e) for e in pyckb.molecule.Split.decode(outputs)]
+
+    @classmethod
+    def peek_outputs_count(cls, data: bytearray) -> int:
+        return pyckb.molecule.Split.count(pyckb.molecule.Split.index(cls.peek_raw(data), 4))
+
+    @classmethod
+    def peek_raw(cls, data: bytearray) -> bytearray:
+        return pyckb.molecule.Split.index(data, 0)
+
+    @classmethod
+    def peek_witnesses(cls, data: bytearray) -> list[bytearray]:
+        return pyckb.molecule.Scale(pyckb.molecule.Bytes).decode(pyckb.molecule.Split.index(data, 1))
+
     def rpc(self) -> dict:
         r = self.raw.rpc()
         r['witnesses'] = [f'0x{e.hex()}' for e in self.witnesses]
         return r
 
+    def rpc_dumps(self) -> bytes:
+        # Serialize rpc() as compact json bytes without building the dict. Hex strings are written by binascii into a
+        # list of parts which is joined once, so large outputs_data and witnesses are not copied through str.
+        r: list[bytes] = []
+
+        def data(b: bytearray) -> None:
+            r.append(b'"0x')
+            r.append(binascii.b2a_hex(b))
+            r.append(b'"')
+
+        def number(n: int) -> None:
+            r.append(b'"0x%x"' % n)
+
+        def script(e: Script) -> None:
+            r.append(b'{"code_hash":')
+            data(e.code_hash)
+            r.append(b',"hash_type":"%s"' % {
+                script_hash_type_data: b'data',
+                script_hash_type_type: b'type',
+                script_hash_type_data1: b'data1',
+                script_hash_type_data2: b'data2',
+            }[e.hash_type])
+            r.append(b',"args":')
+            data(e.args)
+            r.append(b'}')
+
+        def out_point(e: OutPoint) -> None:
+            r.append(b'{"tx_hash":')
+            data(e.tx_hash)
+            r.append(b',"index":')
+            number(e.index)
+            r.append(b'}')
+
+        def array(l: typing.Iterable, f: typing.Callable[[typing.Any], None]) -> None:
+            r.append(b'[')
+            for i, e in enumerate(l):
+                if i:
+                    r.append(b',')
+                f(e)
+            r.append(b']')
+
+        def cell_dep(e: CellDep) -> None:
+            r.append(b'{"out_point":')
+            out_point(e.out_point)
+            r.append(b',"dep_type":"%s"}' % {0: b'code', 1: b'dep_group'}[e.dep_type])
+
+        def cell_input(e: CellInput) -> None:
+            r.append(b'{"since":')
+            number(e.since)
+            r.append(b',"previous_output":')
+            out_point(e.previous_output)
+            r.append(b'}')
+
+        def cell_output(e: CellOutput) -> None:
+            r.append(b'{"capacity":')
+            number(e.capacity)
+            r.append(b',"lock":')
+            script(e.lock)
+            r.append(b',"type":')
+            if e.kype:
+                script(e.kype)
+            else:
+                r.append(b'null')
+            r.append(b'}')
+
+        r.append(b'{"version":')
+        number(self.raw.version)
+        r.append(b',"cell_deps":')
+        array(self.raw.cell_deps, cell_dep)
+        r.append(b',"header_deps":')
+        array(self.raw.header_deps, data)
+        r.append(b',"inputs":')
+        array(self.raw.inputs, cell_input)
+        r.append(b',"outputs":')
+        array(self.raw.outputs, cell_output)
+        r.append(b',"outputs_data":')
+        array(self.raw.outputs_data, data)
+        r.append(b',"witnesses":')
+        array(self.witnesses, data)
+        r.append(b'}')
+        return b''.join(r)
+
     @classmethod
     def rpc_decode(cls, data: dict) -> Transaction:
         return Transaction(
@@ -668,7 +1054,9 @@ def epoch_decode(v: int) -> tuple[int, int, int]:
     return e, i, l
 
 
-class WitnessArgs:
+class WitnessArgs(Frozen):
+    __slots__ = ['lock', 'input_type', 'output_type']
+
     def __init__(
         self,
         lock: bytearray | None,
@@ -690,6 +1078,13 @@ class WitnessArgs:
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> WitnessArgs:
+        if not self.frozen():
+            self.lock = bytes(self.lock) if self.lock is not None else None
+            self.input_type = bytes(self.input_type) if self.input_type is not None else None
+            self.output_type = bytes(self.output_type) if self.output_type is not None else None
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'lock': self.lock.hex() if self.lock else None,
@@ -697,6 +1092,7 @@ class WitnessArgs:
             'output_type': self.output_type.hex() if self.output_type else None,
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.Option(pyckb.molecule.Bytes),
@@ -713,8 +1109,51 @@ class WitnessArgs:
         ]).decode(data)
         return WitnessArgs(result[0], result[1], result[2])
 
+    @classmethod
+    def patch_lock(cls, data: bytearray, lock: bytearray) -> None:
+        # Overwrite the lock of a serialized witness args in place. The new lock must have the same size as the old
+        # one, which is the case when a zeroed placeholder is replaced by a signature, so other fields are not moved.
+        span = cls.peek_lock_span(data)
+        assert span is not None
+        assert span[1] - span[0] == len(lock)
+        data[span[0]:span[1]] = lock
+
+    @classmethod
+    def peek_lock(cls, data: bytearray) -> bytearray | None:
+        span = cls.peek_lock_span(data)
+        if span is None:
+            return None
+        return data[span[0]:span[1]]
+
+    @classmethod
+    def peek_lock_span(cls, data: bytearray) -> tuple[int, int] | None:
+        # Get the position of the lock bytes in a serialized witness args, or None if there is no lock. Only the table
+        # header and the size of the lock are read, input_type and output_type are never touched.
+        assert pyckb.molecule.Split.count(data) == 3
+        head = pyckb.molecule.U32.decode(data[4:8])
+        tail = pyckb.molecule.U32.decode(data[8:12])
+        assert head <= tail
+        if head == tail:
+            return None
+        assert tail - head >= 4
+        assert pyckb.molecule.U32.decode(data[head:head+4]) == tail - head - 4
+        return (head + 4, tail)
+
+
+class RawHeader(Frozen):
+    __slots__ = [
+        'version',
+        'compact_target',
+        'timestamp',
+        'number',
+        'epoch',
+        'parent_hash',
+        'transactions_root',
+        'proposals_hash',
+        'extra_hash',
+        'dao',
+    ]
 
-class RawHeader:
     def __init__(
         self,
         version: int,
@@ -757,6 +1196,20 @@ class RawHeader:
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> RawHeader:
+        if not self.frozen():
+            self.parent_hash = bytes(self.parent_hash)
+            self.transactions_root = bytes(self.transactions_root)
+            self.proposals_hash = bytes(self.proposals_hash)
+            self.extra_hash = bytes(self.extra_hash)
+            self.dao = bytes(self.dao)
+        return super().freeze()
+
+    @memoize
+    def hash(self) -> bytearray:
+        # The pow hash. The proof of work is computed over it and the nonce.
+        return hash(self.molecule())
+
     def json(self) -> dict:
         return {
             'version': self.version,
@@ -771,6 +1224,7 @@ class RawHeader:
             'dao': self.dao.hex(),
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Struct([
             pyckb.molecule.U32,
@@ -857,7 +1311,9 @@ class RawHeader:
         )
 
 
-class Header:
+class Header(Frozen):
+    __slots__ = ['raw', 'nonce']
+
     def __init__(self, raw: RawHeader, nonce: int) -> None:
         self.raw = raw
         self.nonce = nonce
@@ -872,6 +1328,12 @@ class Header:
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> Header:
+        if not self.frozen():
+            self.raw = self.raw.freeze()
+        return super().freeze()
+
+    @memoize
     def hash(self) -> bytearray:
         return hash(self.molecule())
 
@@ -880,6 +1342,7 @@ class Header:
         r['nonce'] = self.nonce
         return r
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Struct([
             pyckb.molecule.Custom(RawHeader.molecule_size()),
@@ -898,6 +1361,26 @@ class Header:
     def molecule_size(cls) -> int:
         return RawHeader.molecule_size() + pyckb.molecule.U128.size()
 
+    @classmethod
+    def peek_dao(cls, data: bytearray) -> bytearray:
+        assert len(data) == cls.molecule_size()
+        return data[0xa0:0xc0]
+
+    @classmethod
+    def peek_epoch(cls, data: bytearray) -> int:
+        assert len(data) == cls.molecule_size()
+        return pyckb.molecule.U64.decode(data[0x18:0x20])
+
+    @classmethod
+    def peek_number(cls, data: bytearray) -> int:
+        assert len(data) == cls.molecule_size()
+        return pyckb.molecule.U64.decode(data[0x10:0x18])
+
+    @classmethod
+    def peek_parent_hash(cls, data: bytearray) -> bytearray:
+        assert len(data) == cls.molecule_size()
+        return data[0x20:0x40]
+
     def rpc(self) -> dict:
         r = self.raw.rpc()
         r['nonce'] = hex(self.nonce)
@@ -930,7 +1413,9 @@ def dao_decode(d: bytearray) -> tuple[int, int, int, int]:
     return c, ar, s, u
 
 
-class UncleBlock:
+class UncleBlock(Frozen):
+    __slots__ = ['header', 'proposals']
+
     def __init__(self, header: Header, proposals: list[bytearray]) -> None:
         self.header = header
         self.proposals = proposals
@@ -939,18 +1424,25 @@ class UncleBlock:
         assert isinstance(other, UncleBlock)
         return all([
             self.header == other.header,
-            self.proposals == other.proposals,
+            list(self.proposals) == list(other.proposals),
         ])
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> UncleBlock:
+        if not self.frozen():
+            self.header = self.header.freeze()
+            self.proposals = tuple([bytes(e) for e in self.proposals])
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'header': self.header.json(),
             'proposals': [e.hex() for e in self.proposals],
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.Custom(0),
@@ -985,7 +1477,34 @@ class UncleBlock:
         )
 
 
-class Block:
+class BlockPeek:
+    # Read fields of a serialized block without decoding the whole block. Block and BlockV1 share the layout of their
+    # first fields, BlockV1 only appends the extension.
+    __slots__: list[str] = []
+
+    @classmethod
+    def iter_tx_slices(cls, data: bytearray) -> typing.Generator[bytearray]:
+        # Yield serialized transactions one by one, the offsets are computed from the table header.
+        txs = pyckb.molecule.Split.index(data, 2)
+        for i in range(pyckb.molecule.Split.count(txs)):
+            yield pyckb.molecule.Split.index(txs, i)
+
+    @classmethod
+    def peek_header(cls, data: bytearray) -> Header:
+        return Header.molecule_decode(pyckb.molecule.Split.index(data, 0))
+
+    @classmethod
+    def peek_transaction(cls, data: bytearray, i: int) -> Transaction:
+        return Transaction.molecule_decode(pyckb.molecule.Split.index(pyckb.molecule.Split.index(data, 2), i))
+
+    @classmethod
+    def peek_transactions_count(cls, data: bytearray) -> int:
+        return pyckb.molecule.Split.count(pyckb.molecule.Split.index(data, 2))
+
+
+class Block(BlockPeek, Frozen):
+    __slots__ = ['header', 'uncles', 'transactions', 'proposals']
+
     def __init__(
         self,
         header: Header,
@@ -1002,14 +1521,22 @@ class Block:
         assert isinstance(other, Block)
         return all([
             self.header == other.header,
-            self.uncles == other.uncles,
-            self.transactions == other.transactions,
-            self.proposals == other.proposals,
+            list(self.uncles) == list(other.uncles),
+            list(self.transactions) == list(other.transactions),
+            list(self.proposals) == list(other.proposals),
         ])
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> Block:
+        if not self.frozen():
+            self.header = self.header.freeze()
+            self.uncles = tuple([e.freeze() for e in self.uncles])
+            self.transactions = tuple([e.freeze() for e in self.transactions])
+            self.proposals = tuple([bytes(e) for e in self.proposals])
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'header': self.header.json(),
@@ -1018,6 +1545,7 @@ class Block:
             'proposals': [e.hex() for e in self.proposals],
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.Custom(0),
@@ -1064,7 +1592,9 @@ class Block:
         )
 
 
-class BlockV1:
+class BlockV1(BlockPeek, Frozen):
+    __slots__ = ['header', 'uncles', 'transactions', 'proposals', 'extension']
+
     def __init__(
         self,
         header: Header,
@@ -1083,15 +1613,24 @@ class BlockV1:
         assert isinstance(other, BlockV1)
         return all([
             self.header == other.header,
-            self.uncles == other.uncles,
-            self.transactions == other.transactions,
-            self.proposals == other.proposals,
+            list(self.uncles) == list(other.uncles),
+            list(self.transactions) == list(other.transactions),
+            list(self.proposals) == list(other.proposals),
             self.extension == other.extension,
         ])
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
 
+    def freeze(self) -> BlockV1:
+        if not self.frozen():
+            self.header = self.header.freeze()
+            self.uncles = tuple([e.freeze() for e in self.uncles])
+            self.transactions = tuple([e.freeze() for e in self.transactions])
+            self.proposals = tuple([bytes(e) for e in self.proposals])
+            self.extension = bytes(self.extension)
+        return super().freeze()
+
     def json(self) -> dict:
         return {
             'header': self.header.json(),
@@ -1101,6 +1640,7 @@ class BlockV1:
             'extension': self.extension.hex(),
         }
 
+    @memoize
     def molecule(self) -> bytearray:
         return pyckb.molecule.Table([
             pyckb.molecule.Custom(0),
@@ -1153,7 +1693,88 @@ class BlockV1:
         )
 
 
+class Lazy(collections.abc.Sequence):
+    # A read-only sequence over a serialized dynvec. Items are decoded by kype on access and are not kept, so code that
+    # touches a few items pays for those items only.
+    __slots__ = ['data', 'kype', 'size']
+
+    def __init__(self, data: bytearray, kype: typing.Callable[[bytearray], typing.Any]) -> None:
+        self.data = data
+        self.kype = kype
+        self.size = pyckb.molecule.Split.count(data)
+
+    def __getitem__(self, i: typing.Any) -> typing.Any:
+        if isinstance(i, slice):
+            return [self[e] for e in range(*i.indices(self.size))]
+        if i < 0:
+            i += self.size
+        if i < 0 or i >= self.size:
+            raise IndexError(i)
+        return self.kype(pyckb.molecule.Split.index(self.data, i))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def slices(self) -> typing.Generator[bytearray]:
+        # Yield the serialized items without decoding them.
+        for i in range(self.size):
+            yield pyckb.molecule.Split.index(self.data, i)
+
+
+class BlockLazy:
+    # A block that keeps its serialized form and decodes parts of it on access. It accepts both Block and BlockV1
+    # data, decode() returns the matching full object.
+    __slots__ = ['data']
+
+    def __init__(self, data: bytearray) -> None:
+        assert pyckb.molecule.Split.count(data) in [4, 5]
+        self.data = data
+
+    def __repr__(self) -> str:
+        return json.dumps(self.decode().json())
+
+    def decode(self) -> Block | BlockV1:
+        if pyckb.molecule.Split.count(self.data) == 5:
+            return BlockV1.molecule_decode(self.data)
+        return Block.molecule_decode(self.data)
+
+    @property
+    def extension(self) -> bytearray | None:
+        if pyckb.molecule.Split.count(self.data) == 5:
+            return pyckb.molecule.Bytes.decode(pyckb.molecule.Split.index(self.data, 4))
+        return None
+
+    @property
+    def header(self) -> Header:
+        return Header.molecule_decode(pyckb.molecule.Split.index(self.data, 0))
+
+    def molecule(self) -> bytearray:
+        return bytearray(self.data)
+
+    @property
+    def proposals(self) -> list[bytearray]:
+        return pyckb.molecule.Slice(pyckb.molecule.Byte10).decode(pyckb.molecule.Split.index(self.data, 3))
+
+    @property
+    def transactions(self) -> Lazy:
+        return Lazy(pyckb.molecule.Split.index(self.data, 2), Transaction.molecule_decode)
+
+    def transactions_hash(self) -> list[bytearray]:
+        # Hash the raw part of every transaction, nothing is decoded.
+        return [Transaction.peek_hash(e) for e in self.transactions.slices()]
+
+    @property
+    def uncles(self) -> Lazy:
+        return Lazy(pyckb.molecule.Split.index(self.data, 1), UncleBlock.molecule_decode)
+
+    def witnesses(self, i: int) -> list[bytearray]:
+        # Decode the witnesses of the i-th transaction only.
+        return Transaction.peek_witnesses(pyckb.molecule.Split.index(pyckb.molecule.Split.index(self.data, 2), i))
+
+
 class CellbaseWitness:
+    __slots__ = ['lock', 'message']
+
     def __init__(self, lock: Script, message: bytearray) -> None:
         self.lock = lock
         self.message = message
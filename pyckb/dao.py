@@ -0,0 +1,79 @@
+# Doc: https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0023-dao-deposit-withdraw/0023-dao-deposit-withdraw.md
+#
+# Nervos DAO withdraw math, computed locally from block headers. Epochs are compared as exact fractions and the
+# compensation is computed with integers, the same way as the dao script does on chain.
+import fractions
+import math
+import pyckb.core
+import pyckb.denomination
+import pyckb.rpc
+import typing
+
+# A deposit is locked for a multiple of this number of epochs.
+lock_period = 180
+# The since flag of an absolute epoch number with fraction.
+since_epoch = 0x2000000000000000
+
+
+def epoch_fraction(epoch: int) -> fractions.Fraction:
+    e, i, l = pyckb.core.epoch_decode(epoch)
+    return e + fractions.Fraction(i, l)
+
+
+def maximum_withdraw(capacity: int, occupied: int, deposit_ar: int, prepare_ar: int) -> int:
+    # Only the free capacity of the deposit cell earns compensation.
+    return (capacity - occupied) * prepare_ar // deposit_ar + occupied
+
+
+def mature(since: int, epoch: int) -> bool:
+    # Whether a withdraw with the given since can be extracted in a block of the given epoch.
+    return epoch_fraction(since & ~since_epoch) <= epoch_fraction(epoch)
+
+
+def occupied(output: pyckb.core.CellOutput, data: bytearray) -> int:
+    # Occupied capacity of a cell in shannons.
+    size = 8 + 33 + len(output.lock.args) + len(data)
+    if output.kype:
+        size += 33 + len(output.kype.args)
+    return size * pyckb.denomination.ckbytes
+
+
+def since(deposit_epoch: int, prepare_epoch: int) -> int:
+    # The since of the withdraw phase 2 input. The lock ends a whole number of lock periods after the deposit, at the
+    # first one that is not earlier than the prepare.
+    e, i, l = pyckb.core.epoch_decode(deposit_epoch)
+    delay = math.ceil((epoch_fraction(prepare_epoch) - epoch_fraction(deposit_epoch)) / lock_period) * lock_period
+    return since_epoch | pyckb.core.epoch_encode(e + delay, i, l)
+
+
+class Calculator:
+    # Compute withdraws for many deposits at once. The header source maps a block number to its header. The
+    # accumulated rate and epoch of each block are decoded once and cached, so a batch of deposits costs one header
+    # lookup per distinct block, not one per cell.
+    def __init__(self, header: typing.Callable[[int], pyckb.core.Header] | None = None) -> None:
+        self.header = header if header is not None else lambda n: pyckb.rpc.get_header_by_number_decode(hex(n))
+        self.cache: dict[int, tuple[int, int]] = {}
+
+    def add(self, header: pyckb.core.Header) -> None:
+        # Headers at hand can be added in advance, they will not be looked up again.
+        self.cache[header.raw.number] = (pyckb.core.dao_decode(header.raw.dao)[1], header.raw.epoch)
+
+    def get(self, number: int) -> tuple[int, int]:
+        # Get the accumulated rate and epoch of a block.
+        if number not in self.cache:
+            self.add(self.header(number))
+        return self.cache[number]
+
+    def maximum_withdraw(self, capacity: int, occupied: int, deposit: int, prepare: int) -> int:
+        return maximum_withdraw(capacity, occupied, self.get(deposit)[0], self.get(prepare)[0])
+
+    def maximum_withdraw_many(self, cells: list[tuple[int, int, int, int]]) -> list[int]:
+        # Each cell is (capacity, occupied, deposit block number, prepare block number).
+        return [self.maximum_withdraw(*e) for e in cells]
+
+    def since(self, deposit: int, prepare: int) -> int:
+        return since(self.get(deposit)[1], self.get(prepare)[1])
+
+    def since_many(self, cells: list[tuple[int, int]]) -> list[int]:
+        # Each cell is (deposit block number, prepare block number).
+        return [self.since(*e) for e in cells]
@@ -0,0 +1,78 @@
+# Doc: https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0010-eaglesong/0010-eaglesong.md
+#
+# Eaglesong is the proof of work hash function of ckb. It is a sponge on a 16 words permutation, with a rate of 8 words
+# and an output of 8 words.
+import hashlib
+
+# The bit matrix of the permutation. Word j of the output of the matrix step is the xor of the words i of the input for
+# which BIT_MATRIX[i][j] is set.
+BIT_MATRIX = [
+    [1, 1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1, 0, 0, 0, 1],
+    [0, 1, 1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1, 0, 0, 1],
+    [0, 0, 1, 1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1, 0, 1],
+    [0, 0, 0, 1, 1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 0, 1, 0, 1, 0, 1, 0, 1, 1, 1, 0],
+    [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 1, 0, 0, 1, 1, 1],
+    [1, 0, 1, 1, 0, 0, 0, 1, 1, 0, 1, 0, 0, 0, 1, 0],
+    [1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 1],
+    [0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 0, 0, 1],
+    [0, 0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 0, 1],
+    [0, 0, 0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 1],
+    [0, 0, 0, 0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1, 1],
+    [1, 1, 1, 1, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 0],
+    [0, 1, 1, 1, 1, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0],
+    [0, 0, 1, 1, 1, 1, 0, 0, 0, 0, 1, 0, 0, 1, 1, 0],
+    [1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 1, 0, 0, 0, 1, 1],
+]
+# Each word of the circulant step is the xor of three rotations of itself.
+COEFFICIENTS = [
+    [0, 2, 4], [0, 13, 22], [0, 4, 19], [0, 3, 14], [0, 27, 31], [0, 3, 8], [0, 17, 26], [0, 3, 12],
+    [0, 18, 22], [0, 12, 18], [0, 4, 7], [0, 4, 31], [0, 12, 27], [0, 7, 17], [0, 7, 8], [0, 1, 13],
+]
+ROUNDS = 43
+# The injection constants are the shake256 output of a quote from Hayek, read as little endian words.
+QUOTE = ' '.join([
+    'The various ways in which the knowledge on which people base their plan is communicated to them is the crucial',
+    'problem for any theory explaining the economic process, and the problem of what is the best way to utilizing',
+    'knowledge initially dispersed among all the people is at least one of the main problems of economic policy - or',
+    'of designing an efficient economic system.',
+])
+INJECTION_DIGEST = hashlib.shake_256(QUOTE.encode()).digest(ROUNDS * 64)
+INJECTION_CONSTANTS = [int.from_bytes(INJECTION_DIGEST[i:i+4], 'little') for i in range(0, ROUNDS * 64, 4)]
+# The columns of the bit matrix, as the indexes of the input words to xor.
+BIT_MATRIX_COLUMNS = [[i for i in range(16) if BIT_MATRIX[i][j]] for j in range(16)]
+
+
+def rotl(x: int, n: int) -> int:
+    return (x << n | x >> (32 - n)) & 0xffffffff
+
+
+def permutation(state: list[int]) -> None:
+    for r in range(ROUNDS):
+        inject = INJECTION_CONSTANTS[r * 16:r * 16 + 16]
+        new = []
+        for j in range(16):
+            x = 0
+            for i in BIT_MATRIX_COLUMNS[j]:
+                x ^= state[i]
+            a, b, c = COEFFICIENTS[j]
+            new.append(rotl(x, a) ^ rotl(x, b) ^ rotl(x, c) ^ inject[j])
+        # Add, rotate, add on each pair of words.
+        for i in range(0, 16, 2):
+            a = rotl((new[i] + new[i + 1]) & 0xffffffff, 8)
+            b = rotl(new[i + 1], 24)
+            state[i] = a
+            state[i + 1] = (a + b) & 0xffffffff
+
+
+def eaglesong(data: bytearray) -> bytearray:
+    # The input and the delimiter 0x06 are absorbed by 32 bytes blocks of big endian words. As in the reference code,
+    # the bytes past the delimiter are not shifted in, so the last word is only made of the remaining bytes. The output
+    # is squeezed as little endian words.
+    state = [0] * 16
+    pads = bytearray(data) + bytearray([0x06])
+    for i in range(0, len(pads), 32):
+        for j in range(8):
+            state[j] ^= int.from_bytes(pads[i + j * 4:i + j * 4 + 4])
+        permutation(state)
+    return bytearray(b''.join([e.to_bytes(4, 'little') for e in state[:8]]))
@@ -1,6 +1,8 @@
 # Doc: https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0008-serialization/0008-serialization.md
+import array
 import itertools
 import struct
+import sys
 import typing
 
 
@@ -192,6 +194,30 @@ class F64:
         return 8
 
 
+def decode_array(kype: typing.Any, buffer: bytearray | memoryview) -> array.array:
+    # Decode packed little-endian primitives without creating a python object per item.
+    code = {
+        U8: 'B', U16: 'H', U32: 'I', U64: 'Q',
+        I8: 'b', I16: 'h', I32: 'i', I64: 'q',
+        F32: 'f', F64: 'd',
+    }[kype]
+    r = array.array(code)
+    assert r.itemsize == kype.size()
+    r.frombytes(buffer)
+    if sys.byteorder == 'big':
+        r.byteswap()
+    return r
+
+
+def decode_view(kype: typing.Any, buffer: bytearray | memoryview) -> list[memoryview]:
+    # Split packed fixed-size items into views of the buffer, nothing is copied. Note that a bytearray can not be
+    # resized while views of it are alive.
+    step = kype.size()
+    view = memoryview(buffer)
+    assert len(view) % step == 0
+    return [view[i:i+step] for i in range(0, len(view), step)]
+
+
 class Array:
     def __init__(self, kype: typing.Any, size: int) -> None:
         self.kype = kype
@@ -199,7 +225,19 @@ class Array:
 
     def decode(self, buffer: bytearray) -> list:
         assert isinstance(buffer, bytearray)
-        return [self.kype.decode(bytearray(e)) for e in itertools.batched(buffer, self.kype.size())]
+        assert len(buffer) == self.size()
+        step = self.kype.size()
+        return [self.kype.decode(buffer[i:i+step]) for i in range(0, len(buffer), step)]
+
+    def decode_array(self, buffer: bytearray) -> array.array:
+        # Decode a vector of primitives into an array in one go.
+        assert len(buffer) == self.size()
+        return decode_array(self.kype, buffer)
+
+    def decode_view(self, buffer: bytearray) -> list[memoryview]:
+        # Decode a vector of fixed-size items into zero-copy views of the buffer.
+        assert len(buffer) == self.size()
+        return decode_view(self.kype, buffer)
 
     def encode(self, pylist: list) -> bytearray:
         assert len(pylist) == self.lens
@@ -214,6 +252,7 @@ class Struct:
         self.kype = kype
 
     def decode(self, buffer: bytearray) -> list:
+        assert len(buffer) == sum([e.size() for e in self.kype])
         r = []
         s = 0
         for e in self.kype:
@@ -235,7 +274,19 @@ class Slice:
 
     def decode(self, buffer: bytearray) -> list:
         assert isinstance(buffer, bytearray)
-        return [self.kype.decode(bytearray(e)) for e in itertools.batched(buffer[4:], self.kype.size())]
+        step = self.kype.size()
+        assert len(buffer) == 4 + U32.decode(buffer[:4]) * step
+        return [self.kype.decode(buffer[i:i+step]) for i in range(4, len(buffer), step)]
+
+    def decode_array(self, buffer: bytearray) -> array.array:
+        # Decode a vector of primitives into an array in one go.
+        assert len(buffer) == 4 + U32.decode(buffer[:4]) * self.kype.size()
+        return decode_array(self.kype, memoryview(buffer)[4:])
+
+    def decode_view(self, buffer: bytearray) -> list[memoryview]:
+        # Decode a vector of fixed-size items into zero-copy views of the buffer.
+        assert len(buffer) == 4 + U32.decode(buffer[:4]) * self.kype.size()
+        return decode_view(self.kype, memoryview(buffer)[4:])
 
     def encode(self, pylist: list) -> bytearray:
         body = bytearray(itertools.chain(*[self.kype.encode(e) for e in pylist]))
@@ -246,15 +297,13 @@ class Slice:
 class Split:
     @classmethod
     def decode(cls, buffer: bytearray) -> list[bytearray]:
-        assert len(buffer) >= 4
-        assert len(buffer) == U32.decode(buffer[:4])
-        if len(buffer) == 4:
-            return []
-        nums = U32.decode(buffer[4:8]) // 4 - 1
+        nums = cls.count(buffer)
         head = []
         for i in range(nums):
             head.append(U32.decode(buffer[i * 4 + 4: i * 4 + 8]))
         head.append(len(buffer))
+        for i in range(nums):
+            assert head[i] <= head[i+1]
         body = []
         for i in range(nums):
             body.append(buffer[head[i]:head[i+1]])
@@ -274,6 +323,30 @@ class Split:
         size = head_size + body_size
         return U32.encode(size) + head + body
 
+    @classmethod
+    def count(cls, buffer: bytearray) -> int:
+        # Get the number of items by reading the header only.
+        assert len(buffer) >= 4
+        assert len(buffer) == U32.decode(buffer[:4])
+        if len(buffer) == 4:
+            return 0
+        # The first offset is also the size of the header, it must be sane before the header is read.
+        head = U32.decode(buffer[4:8])
+        assert head % 4 == 0
+        assert head >= 8
+        assert head <= len(buffer)
+        return head // 4 - 1
+
+    @classmethod
+    def index(cls, buffer: bytearray, i: int) -> bytearray:
+        # Get the i-th item by computing its offset from the header, other items are left untouched.
+        nums = cls.count(buffer)
+        assert i >= 0
+        assert i < nums
+        head = U32.decode(buffer[i * 4 + 4: i * 4 + 8])
+        tail = U32.decode(buffer[i * 4 + 8: i * 4 + 12]) if i + 1 < nums else len(buffer)
+        return buffer[head:tail]
+
 
 class Scale:
     def __init__(self, kype: typing.Any) -> None:
@@ -296,6 +369,10 @@ class Table:
     def encode(self, pylist: list) -> bytearray:
         return Split.encode([e[0].encode(e[1]) for e in zip(self.kype, pylist)])
 
+    def index(self, buffer: bytearray, i: int) -> typing.Any:
+        # Decode only the i-th field.
+        return self.kype[i].decode(Split.index(buffer, i))
+
 
 class Option:
     def __init__(self, kype: typing.Any) -> None:
@@ -323,6 +400,7 @@ class Custom:
         self.lens = size
 
     def decode(self, buffer: bytearray) -> bytearray:
+        assert self.lens == 0 or len(buffer) == self.lens
         return buffer
 
     def encode(self, buffer: bytearray) -> bytearray:
@@ -1,3 +1,4 @@
+import asyncio
 import math
 import threading
 import time
@@ -39,3 +40,40 @@ class Limits:
                 self.size += cycles * self.addition
             self.size -= n
             assert self.size <= self.capacity
+
+
+class AsyncLimits:
+    # Same as Limits, for asyncio. The tokens are taken before sleeping, so concurrent waiters queue up behind each
+    # other instead of all waking up at the same time. Only use it from one event loop.
+
+    def __init__(self, n: int, p: float) -> None:
+        # Generate n tokens every p seconds.
+        assert n > 0
+        assert p > 0
+        p = int(p * 10**9)
+        g = math.gcd(n, p)
+        self.addition = n // g
+        self.capacity = n
+        self.last = time.time_ns()
+        self.size = n
+        self.step = p // g
+
+    async def wait(self, n: int) -> None:
+        # Wait ensures there are enough resources (n) available, sleeping without blocking the event loop.
+        assert n > 0
+        curr = time.time_ns()
+        # The last refill may lie in the future, when earlier waiters have reserved tokens not yet generated.
+        if curr > self.last:
+            cycles = (curr - self.last) // self.step
+            self.last += cycles * self.step
+            self.size += cycles * self.addition
+            self.size = min(self.size, self.capacity)
+        delay = 0
+        if self.size < n:
+            cycles = (n - self.size + self.addition - 1) // self.addition
+            self.last += cycles * self.step
+            self.size += cycles * self.addition
+            delay = self.last - curr
+        self.size -= n
+        if delay > 0:
+            await asyncio.sleep(delay / 1e9)
@@ -1,28 +1,340 @@
+import collections
+import concurrent.futures
 import itertools
+import json
 import pyckb.config
+import pyckb.core
+import pyckb.molecule
 import pyckb.rate
 import random
+import re
 import requests
+import sqlite3
+import threading
+import time
 import typing
 
 # Doc: https://github.com/nervosnetwork/ckb/tree/develop/rpc
 
-
-def call(method: str, params: list) -> typing.Any:
+# Parse responses with orjson if it is installed, it is several times faster than the standard library on large blocks.
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+class Transport:
+    # A pooled http transport for one endpoint. Connections are kept alive and reused between calls. All threads share
+    # one session, whose connection pool is thread safe. At most pool connections are open at once, other requests
+    # wait for a free one.
+    def __init__(self, url: str, pool: int, timeout: tuple[float, float]) -> None:
+        self.url = url
+        self.timeout = timeout
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, **kwargs: typing.Any) -> requests.Response:
+        return self.session.post(self.url, timeout=self.timeout, **kwargs)
+
+
+transports: dict[str, Transport] = {}
+
+
+def transport() -> Transport:
+    # The transport of the current endpoint. Transports are created on first use and shared.
+    conf = pyckb.config.current.rpc
+    t = transports.get(conf.url)
+    if t is None:
+        t = transports.setdefault(conf.url, Transport(conf.url, conf.pool, tuple(conf.timeout)))
+    return t
+
+
+class Cache:
+    # A cache of rpc results that never change: blocks and headers by hash, and committed transactions, blocks and
+    # headers by number once they are depth blocks below the tip. Results are kept serialized, so callers can modify
+    # what they get. An in-memory lru holds up to size bytes. If a path is given, results are also kept in a sqlite
+    # database, which survives restarts and can be shared by several processes.
+    def __init__(self, size: int, path: str | None = None, depth: int = 64) -> None:
+        self.capacity = size
+        self.depth = depth
+        self.disk: sqlite3.Connection | None = None
+        self.hits = 0
+        self.lock = threading.Lock()
+        self.lru: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        self.miss = 0
+        self.size = 0
+        self.tip: dict[str, tuple[int, float]] = {}
+        if path:
+            self.disk = sqlite3.connect(path, timeout=16, isolation_level=None, check_same_thread=False)
+            self.disk.execute('pragma journal_mode=wal')
+            self.disk.execute('create table if not exists cache (k text primary key, v blob)')
+
+    def deep(self, number: int) -> bool:
+        # Whether a block is deep enough to be considered final. The tip is only fetched again when a block is above
+        # the last known one, and at most once a second, so results near the tip do not double the requests.
+        url = pyckb.config.current.rpc.url
+        tip, last = self.tip.get(url, (0, 0.0))
+        if number + self.depth > tip and time.monotonic() - last >= 1:
+            tip, last = int(get_tip_block_number(), 16), time.monotonic()
+            self.tip[url] = (tip, last)
+        return number + self.depth <= tip
+
+    def get(self, key: str) -> typing.Any:
+        # Return the result, or None on a miss.
+        with self.lock:
+            data = self.lru.get(key)
+            if data is not None:
+                self.lru.move_to_end(key)
+            elif self.disk:
+                row = self.disk.execute('select v from cache where k = ?', [key]).fetchone()
+                if row:
+                    data = row[0]
+                    self.put(key, data)
+            if data is None:
+                self.miss += 1
+                return None
+            self.hits += 1
+        return loads(data)
+
+    def key(self, method: str, params: list) -> str:
+        # Results are only valid for the chain they come from.
+        return f'{pyckb.config.current.rpc.url} {method} {json.dumps(params)}'
+
+    def put(self, key: str, data: bytes) -> None:
+        # Put into the lru, evicting the least recently used results. Results larger than the whole lru are skipped.
+        if len(data) > self.capacity or key in self.lru:
+            return
+        self.lru[key] = data
+        self.size += len(data)
+        while self.size > self.capacity:
+            self.size -= len(self.lru.popitem(last=False)[1])
+
+    def rate(self) -> float:
+        # Hit rate since creation.
+        return self.hits / max(self.hits + self.miss, 1)
+
+    def set(self, key: str, result: typing.Any) -> None:
+        data = json.dumps(result).encode()
+        with self.lock:
+            self.put(key, data)
+            if self.disk:
+                self.disk.execute('insert or replace into cache values (?, ?)', [key, data])
+
+
+# The global cache used by the rpc functions. It is off by default: a one-off bulk fetch would pay for serializing
+# every result and never read them back. Set it to a Cache to turn it on:
+#
+# pyckb.rpc.cache = pyckb.rpc.Cache(16 << 20)
+cache: Cache | None = None
+
+
+def throttle(n: int = 1) -> None:
+    # All requests share a single rate limiter. A batch request takes one token per call.
     if not hasattr(call, 'rate'):
         setattr(call, 'rate', pyckb.rate.Limits(pyckb.config.current.rpc.qps, 1))
-    getattr(call, 'rate').wait(1)
-    r = requests.post(pyckb.config.current.rpc.url, json={
+    getattr(call, 'rate').wait(n)
+
+
+def call(method: str, params: list) -> typing.Any:
+    throttle()
+    r = loads(transport().post(json={
         'id': random.randint(0x00000000, 0xffffffff),
         'jsonrpc': '2.0',
         'method': method,
         'params': params,
-    }).json()
+    }).content)
+    if 'error' in r:
+        raise Exception(r['error'])
+    return r['result']
+
+
+def call_dumps(method: str, params: list[bytes]) -> typing.Any:
+    # Same as call, but the params are already serialized json values. The request body is joined from them in one
+    # go and posted as is, so a large transaction is never converted to a dict or passed through json.dumps.
+    throttle()
+    rid = random.randint(0x00000000, 0xffffffff)
+    body = b''.join([
+        b'{"id":%d,"jsonrpc":"2.0","method":"%s","params":[' % (rid, method.encode()),
+        b','.join(params),
+        b']}',
+    ])
+    r = loads(transport().post(data=body, headers={
+        'content-type': 'application/json',
+    }).content)
     if 'error' in r:
         raise Exception(r['error'])
     return r['result']
 
 
+def call_cache(method: str, params: list, immutable: typing.Callable[[typing.Any], bool]) -> typing.Any:
+    # Same as call, but served from the cache. A fresh result is only cached if immutable(result) holds, so pending or
+    # shallow results are fetched again the next time.
+    if cache is None:
+        return call(method, params)
+    key = cache.key(method, params)
+    r = cache.get(key)
+    if r is not None:
+        return r
+    r = call(method, params)
+    if immutable(r):
+        cache.set(key, r)
+    return r
+
+
+def committed(r: dict | None) -> bool:
+    # A committed transaction can still be dropped by a reorganization, until its block is deep enough.
+    if r is None or r['tx_status']['status'] != 'committed' or r['tx_status'].get('block_number') is None:
+        return False
+    return deep(r['tx_status']['block_number'])(r)
+
+
+def deep(block_number: str) -> typing.Callable[[typing.Any], bool]:
+    return lambda r: r is not None and cache is not None and cache.deep(int(block_number, 16))
+
+
+def known(r: typing.Any) -> bool:
+    return r is not None
+
+
+def call_stream(method: str, params: list, path: list[str]) -> typing.Generator[typing.Any]:
+    # Same as call, but the response is read incrementally and the items of the array at path are parsed and yielded
+    # one by one. Memory is bounded by the largest item, not by the size of the response.
+    throttle()
+    with transport().post(json={
+        'id': random.randint(0x00000000, 0xffffffff),
+        'jsonrpc': '2.0',
+        'method': method,
+        'params': params,
+    }, stream=True) as r:
+        # An http error has no json-rpc body, raise it before the scanner tries to parse one.
+        r.raise_for_status()
+        yield from scan(r.iter_content(1 << 16), path)
+
+
+def batch(calls: list[tuple[str, list]]) -> list[typing.Any]:
+    # Send many calls as one json-rpc batch request, so that n calls cost a single round trip. Results are returned in
+    # the order of the calls. A failed call does not fail the batch, an exception holding its error is returned in its
+    # place.
+    if not calls:
+        return []
+    throttle(len(calls))
+    r = loads(transport().post(json=[{
+        'id': i,
+        'jsonrpc': '2.0',
+        'method': method,
+        'params': params,
+    } for i, (method, params) in enumerate(calls)]).content)
+    # The whole batch is rejected with a single error object, for example if it is too large.
+    if isinstance(r, dict):
+        raise Exception(r['error'])
+    result: list[typing.Any] = [Exception(f'rpc: missing response for id {i}') for i in range(len(calls))]
+    for e in r:
+        # A response with an id that was not sent is skipped, its call then reports a missing response.
+        i = e.get('id')
+        if type(i) is not int or not 0 <= i < len(calls):
+            continue
+        result[i] = Exception(e['error']) if 'error' in e else e['result']
+    return result
+
+
+def batch_cache(calls: list[tuple[str, list]], immutable: typing.Callable[[typing.Any], bool]) -> list[typing.Any]:
+    # Same as batch, but served from the cache, see call_cache. Only the missing results are requested.
+    if cache is None:
+        return batch(calls)
+    keys = [cache.key(method, params) for method, params in calls]
+    result = [cache.get(e) for e in keys]
+    miss = [i for i, e in enumerate(result) if e is None]
+    for i, e in zip(miss, batch([calls[i] for i in miss])):
+        result[i] = e
+        if not isinstance(e, Exception) and immutable(e):
+            cache.set(keys[i], e)
+    return result
+
+
+scan_token = re.compile(rb'["{}\[\]:,]')
+
+
+def scan(chunks: typing.Iterable[bytes], path: list[str]) -> typing.Generator[typing.Any]:
+    # An incremental json scanner. It tracks only the nesting and the object keys, so that it can find the array at
+    # path, and yields each object or array item of it as soon as its closing bracket arrives. Strings are skipped
+    # with a find for the closing quote, so long hex strings cost little. Consumed bytes are dropped from the buffer
+    # once the array is found. If it is not found, the whole response is parsed: an error is raised, and a null result,
+    # such as an unknown block, yields nothing.
+    full: bytearray | None = bytearray()
+    buf = bytearray()
+    pos = 0
+    stack: list[list] = []
+    key = None
+    expect_key = False
+    depth = -1
+    start = -1
+    for chunk in chunks:
+        if full is not None:
+            full.extend(chunk)
+        buf.extend(chunk)
+        while True:
+            m = scan_token.search(buf, pos)
+            if not m:
+                pos = len(buf)
+                break
+            pos = m.start()
+            c = buf[pos]
+            if c == 0x22:
+                end = pos
+                while True:
+                    end = buf.find(b'"', end + 1)
+                    if end < 0:
+                        break
+                    # A quote preceded by an odd number of backslashes is escaped.
+                    back = end
+                    while buf[back - 1] == 0x5c:
+                        back -= 1
+                    if (end - back) % 2 == 0:
+                        break
+                if end < 0:
+                    # The string is incomplete, wait for more data.
+                    break
+                if expect_key:
+                    key = buf[pos + 1:end].decode()
+                pos = end + 1
+                continue
+            pos += 1
+            match c:
+                case 0x7b | 0x5b:
+                    if depth < 0 and c == 0x5b and [e[1] for e in stack] == path:
+                        depth = len(stack) + 1
+                        full = None
+                    elif start < 0 and len(stack) == depth:
+                        start = pos - 1
+                    stack.append([c, None])
+                    expect_key = c == 0x7b
+                case 0x7d | 0x5d:
+                    stack.pop()
+                    if start >= 0 and len(stack) == depth:
+                        yield loads(buf[start:pos])
+                        start = -1
+                    if len(stack) == depth - 1:
+                        return
+                    expect_key = False
+                case 0x3a:
+                    stack[-1][1] = key
+                    expect_key = False
+                case 0x2c:
+                    expect_key = stack[-1][0] == 0x7b
+        keep = start if start >= 0 else pos
+        del buf[:keep]
+        pos -= keep
+        start = start - keep if start >= 0 else -1
+    assert full is not None
+    r = loads(full)
+    if 'error' in r:
+        raise Exception(r['error'])
+    assert r['result'] is None, f'rpc: {path} not found'
+
+
 def wait(hash: str) -> None:
     for _ in itertools.repeat(0):
         r = get_transaction(hash)
@@ -30,6 +342,57 @@ def wait(hash: str) -> None:
             break
 
 
+def iter_blocks(
+    start: int,
+    end: int,
+    concurrency: int = 8,
+    window: int = 0,
+) -> typing.Generator[pyckb.core.Block | pyckb.core.BlockV1]:
+    # Yield the decoded blocks in [start, end) in height order. Blocks are fetched by a pool of concurrency threads, so
+    # a backfill is bound by throughput instead of round trip latency. All requests still go through the shared rate
+    # limiter. At most window blocks, by default twice the concurrency, are fetched ahead of the consumer, which caps
+    # the memory held by blocks that are done but not yet yielded.
+    assert concurrency > 0
+    window = window or concurrency * 2
+    assert window >= concurrency
+    numbers = iter(range(start, end))
+    queue: collections.deque[concurrent.futures.Future] = collections.deque()
+    pool = concurrent.futures.ThreadPoolExecutor(concurrency)
+    try:
+        for n in itertools.islice(numbers, window):
+            queue.append(pool.submit(get_block_by_number_decode, hex(n)))
+        while queue:
+            block = queue.popleft().result()
+            for n in itertools.islice(numbers, 1):
+                queue.append(pool.submit(get_block_by_number_decode, hex(n)))
+            yield block
+    finally:
+        # The consumer may stop early, blocks not yet fetched are dropped.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# The *_decode functions return core objects. Where the rpc supports it they request verbosity 0, the node then sends
+# the molecule serialization as one hex string, which is decoded in a single call instead of walking json fields.
+
+
+def block_decode(data: str) -> pyckb.core.Block | pyckb.core.BlockV1:
+    # Blocks with an extension have 5 fields, others have 4.
+    data = bytearray.fromhex(data[2:])
+    if pyckb.molecule.Split.count(data) == 5:
+        return pyckb.core.BlockV1.molecule_decode(data)
+    return pyckb.core.Block.molecule_decode(data)
+
+
+def cell_decode(data: dict, interner: pyckb.core.Interner | None = None) -> dict:
+    return {
+        'block_number': int(data['block_number'], 16),
+        'out_point': pyckb.core.OutPoint.rpc_decode(data['out_point']),
+        'output': pyckb.core.CellOutput.rpc_decode(data['output'], interner),
+        'output_data': bytearray.fromhex(data['output_data'][2:]) if data['output_data'] else bytearray(),
+        'tx_index': int(data['tx_index'], 16),
+    }
+
+
 def add_node():
     pass
 
@@ -38,8 +401,10 @@ def calculate_dao_field():
     pass
 
 
-def calculate_dao_maximum_withdraw():
-    pass
+def calculate_dao_maximum_withdraw(out_point: dict, kind: str) -> str:
+    # The kind is the hash of the block in which the withdraw is prepared, or of any later block. For many cells,
+    # pyckb.dao.Calculator computes the same value locally.
+    return call('calculate_dao_maximum_withdraw', [out_point, kind])
 
 
 def clear_banned_addresses():
@@ -71,11 +436,40 @@ def get_banned_addresses():
 
 
 def get_block(block_hash: str) -> dict:
-    return call('get_block', [block_hash])
+    return call_cache('get_block', [block_hash], known)
 
 
 def get_block_by_number(block_number: str) -> dict:
-    return call('get_block_by_number', [block_number])
+    return call_cache('get_block_by_number', [block_number], deep(block_number))
+
+
+def get_block_by_number_decode(block_number: str) -> pyckb.core.Block | pyckb.core.BlockV1:
+    return block_decode(call_cache('get_block_by_number', [block_number, '0x0'], deep(block_number)))
+
+
+def get_block_by_number_lazy(block_number: str) -> pyckb.core.BlockLazy:
+    r = call_cache('get_block_by_number', [block_number, '0x0'], deep(block_number))
+    return pyckb.core.BlockLazy(bytearray.fromhex(r[2:]))
+
+
+def get_block_by_number_stream(block_number: str) -> typing.Generator[pyckb.core.Transaction]:
+    # Yield the transactions of a block one by one, see call_stream.
+    for e in call_stream('get_block_by_number', [block_number], ['result', 'transactions']):
+        yield pyckb.core.Transaction.rpc_decode(e)
+
+
+def get_block_decode(block_hash: str) -> pyckb.core.Block | pyckb.core.BlockV1:
+    return block_decode(call_cache('get_block', [block_hash, '0x0'], known))
+
+
+def get_block_lazy(block_hash: str) -> pyckb.core.BlockLazy:
+    return pyckb.core.BlockLazy(bytearray.fromhex(call_cache('get_block', [block_hash, '0x0'], known)[2:]))
+
+
+def get_block_stream(block_hash: str) -> typing.Generator[pyckb.core.Transaction]:
+    # Yield the transactions of a block one by one, see call_stream.
+    for e in call_stream('get_block', [block_hash], ['result', 'transactions']):
+        yield pyckb.core.Transaction.rpc_decode(e)
 
 
 def get_block_economic_state():
@@ -106,6 +500,19 @@ def get_cells(search_key: dict, order: str, limit: str, after: str | None) -> di
     return call('get_cells', [search_key, order, limit, after])
 
 
+def get_cells_decode(
+    search_key: dict,
+    order: str,
+    limit: str,
+    after: str | None,
+    interner: pyckb.core.Interner | None = None,
+) -> dict:
+    # The indexer has no molecule output, cells are decoded from json. Pass an interner to share the lock scripts.
+    r = get_cells(search_key, order, limit, after)
+    r['objects'] = [cell_decode(e, interner) for e in r['objects']]
+    return r
+
+
 def get_cells_capacity(search_key: dict) -> dict:
     return call('get_cells_capacity', [search_key])
 
@@ -122,6 +529,19 @@ def get_cells_iter(search_key: dict) -> typing.Generator:
             break
 
 
+def get_cells_stream(
+    search_key: dict,
+    order: str,
+    limit: str,
+    after: str | None,
+    interner: pyckb.core.Interner | None = None,
+) -> typing.Generator[dict]:
+    # Yield the decoded cells of a page one by one, see call_stream and get_cells_decode. The page cursor is not
+    # returned in this mode.
+    for e in call_stream('get_cells', [search_key, order, limit, after], ['result', 'objects']):
+        yield cell_decode(e, interner)
+
+
 def get_consensus():
     pass
 
@@ -147,11 +567,28 @@ def get_fork_block():
 
 
 def get_header(block_hash: str) -> dict:
-    return call('get_header', [block_hash])
+    return call_cache('get_header', [block_hash], known)
 
 
 def get_header_by_number(block_number: str) -> dict:
-    return call('get_header_by_number', [block_number])
+    return call_cache('get_header_by_number', [block_number], deep(block_number))
+
+
+def get_header_by_number_decode(block_number: str) -> pyckb.core.Header:
+    r = call_cache('get_header_by_number', [block_number, '0x0'], deep(block_number))
+    return pyckb.core.Header.molecule_decode(bytearray.fromhex(r[2:]))
+
+
+def get_header_decode(block_hash: str) -> pyckb.core.Header:
+    r = call_cache('get_header', [block_hash, '0x0'], known)
+    return pyckb.core.Header.molecule_decode(bytearray.fromhex(r[2:]))
+
+
+def get_headers_batch(block_hashes: list[str]) -> list[pyckb.core.Header | None | Exception]:
+    # Same as get_header_decode for many blocks in one request. Unknown blocks give None.
+    r = batch_cache([('get_header', [e, '0x0']) for e in block_hashes], known)
+    return [e if e is None or isinstance(e, Exception) else pyckb.core.Header.molecule_decode(
+        bytearray.fromhex(e[2:])) for e in r]
 
 
 def get_indexer_tip() -> dict:
@@ -183,15 +620,33 @@ def get_tip_header() -> dict:
 
 
 def get_transaction(tx_hash: str) -> dict:
-    return call('get_transaction', [tx_hash])
+    return call_cache('get_transaction', [tx_hash], committed)
 
 
-def get_transaction_and_witness_proof():
-    pass
+def get_transaction_decode(tx_hash: str) -> dict:
+    # Same as get_transaction, but the transaction field is a core.Transaction, or None if the transaction is unknown.
+    r = call_cache('get_transaction', [tx_hash, '0x0'], committed)
+    if r['transaction']:
+        r['transaction'] = pyckb.core.Transaction.molecule_decode(bytearray.fromhex(r['transaction'][2:]))
+    return r
 
 
-def get_transaction_proof():
-    pass
+def get_transactions_batch(tx_hashes: list[str]) -> list[dict | Exception]:
+    # Same as get_transaction_decode for many transactions in one request.
+    r = batch_cache([('get_transaction', [e, '0x0']) for e in tx_hashes], committed)
+    for e in r:
+        if isinstance(e, Exception) or not e['transaction']:
+            continue
+        e['transaction'] = pyckb.core.Transaction.molecule_decode(bytearray.fromhex(e['transaction'][2:]))
+    return r
+
+
+def get_transaction_and_witness_proof(tx_hashes: list[str], block_hash: str | None) -> dict:
+    return call('get_transaction_and_witness_proof', [tx_hashes, block_hash])
+
+
+def get_transaction_proof(tx_hashes: list[str], block_hash: str | None) -> dict:
+    return call('get_transaction_proof', [tx_hashes, block_hash])
 
 
 def get_transactions():
@@ -230,7 +685,10 @@ def send_alert():
     pass
 
 
-def send_transaction(transaction: dict) -> str:
+def send_transaction(transaction: dict | pyckb.core.Transaction) -> str:
+    # A core transaction is serialized directly into the request body, see Transaction.rpc_dumps.
+    if isinstance(transaction, pyckb.core.Transaction):
+        return call_dumps('send_transaction', [transaction.rpc_dumps(), b'"passthrough"'])
     return call('send_transaction', [transaction, 'passthrough'])
 
 
@@ -282,9 +740,10 @@ def update_main_logger():
     pass
 
 
-def verify_transaction_and_witness_proof():
-    pass
+def verify_transaction_and_witness_proof(tx_proof: dict) -> list[str]:
+    return call('verify_transaction_and_witness_proof', [tx_proof])
 
 
-def verify_transaction_proof():
-    pass
+def verify_transaction_proof(tx_proof: dict) -> list[str]:
+    # See pyckb.cbmt.verify for a local check against a known header.
+    return call('verify_transaction_proof', [tx_proof])
@@ -0,0 +1,388 @@
+# Doc: https://github.com/nervosnetwork/molecule/blob/master/docs/molecule_schema_language.md
+#
+# Load a molecule schema (.mol) and generate specialized codec classes for it. Each generated class has the same
+# interface as the codecs in pyckb.molecule (decode, encode and size for fixed-size types), so they can be mixed freely.
+# Decoded values are represented as:
+#
+# byte                  -> int
+# array/fixvec of byte  -> bytearray
+# array/fixvec/dynvec   -> list
+# struct/table          -> pyckb.objectdict.ObjectDict
+# option                -> value or None
+# union                 -> tuple[str, value], the name of the item type and its value
+#
+# The generated source is cached on disk keyed by the hash of the schema text, so loading the same schema again only
+# costs an import.
+import hashlib
+import importlib.util
+import os
+import re
+import types
+
+# Bump the version whenever the generated code changes, so that stale cache entries are not used.
+version = 2
+# The directory where generated codecs are stored.
+cache = os.path.join(os.path.expanduser('~'), '.cache', 'pyckb', 'schema')
+
+
+def tokenize(text: str) -> list[str]:
+    # Split the schema into words and punctuations, comments are dropped.
+    text = re.sub(r'/\*.*?\*/', ' ', text, flags=re.DOTALL)
+    text = re.sub(r'//[^\n]*', ' ', text)
+    r = []
+    for e in re.finditer(r'\s*([A-Za-z_][A-Za-z0-9_]*|[0-9]+|[\[\]{}<>();:,]|\S)', text):
+        r.append(e.group(1))
+    return r
+
+
+def parse(text: str) -> list[dict]:
+    # Parse the schema into a list of declarations. Import statements must have been resolved by the caller.
+    tok = tokenize(text)
+    pos = 0
+
+    def peek() -> str:
+        return tok[pos] if pos < len(tok) else ''
+
+    def take(want: str | None = None) -> str:
+        nonlocal pos
+        assert pos < len(tok), 'schema: unexpected end of input'
+        word = tok[pos]
+        assert want is None or word == want, f'schema: expect {want}, got {word}'
+        pos += 1
+        return word
+
+    def name() -> str:
+        word = take()
+        assert re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', word), f'schema: bad name {word}'
+        return word
+
+    r = []
+    while pos < len(tok):
+        kind = take()
+        match kind:
+            case 'array':
+                decl = {'kind': kind, 'name': name()}
+                take('[')
+                decl['item'] = name()
+                take(';')
+                decl['size'] = int(take())
+                take(']')
+                take(';')
+            case 'vector':
+                decl = {'kind': kind, 'name': name()}
+                take('<')
+                decl['item'] = name()
+                take('>')
+                take(';')
+            case 'option':
+                decl = {'kind': kind, 'name': name()}
+                take('(')
+                decl['item'] = name()
+                take(')')
+                take(';')
+            case 'struct' | 'table':
+                decl = {'kind': kind, 'name': name(), 'fields': []}
+                take('{')
+                while peek() != '}':
+                    field = name()
+                    take(':')
+                    decl['fields'].append((field, name()))
+                    if peek() != '}':
+                        take(',')
+                take('}')
+                if peek() == ';':
+                    take(';')
+            case 'union':
+                decl = {'kind': kind, 'name': name(), 'items': []}
+                take('{')
+                item_id = 0
+                while peek() != '}':
+                    item = name()
+                    if peek() == ':':
+                        take(':')
+                        item_id = int(take())
+                    decl['items'].append((item, item_id))
+                    item_id += 1
+                    if peek() != '}':
+                        take(',')
+                take('}')
+                if peek() == ';':
+                    take(';')
+            case _:
+                assert False, f'schema: unknown declaration {kind}'
+        r.append(decl)
+    return r
+
+
+def generate(decls: list[dict]) -> str:
+    # Generate python source code for the declarations.
+    table = {e['name']: e for e in decls}
+    sizes: dict[str, int | None] = {'byte': 1}
+
+    def size(kype: str) -> int | None:
+        # Size of a fixed-size type, or None for dynamic-size types.
+        if kype in sizes:
+            return sizes[kype]
+        assert kype in table, f'schema: undefined type {kype}'
+        decl = table[kype]
+        sizes[kype] = None
+        match decl['kind']:
+            case 'array':
+                item = size(decl['item'])
+                assert item is not None, f'schema: array {kype} must contain fixed-size items'
+                sizes[kype] = item * decl['size']
+            case 'struct':
+                full = 0
+                for _, e in decl['fields']:
+                    item = size(e)
+                    assert item is not None, f'schema: struct {kype} must contain fixed-size fields'
+                    full += item
+                sizes[kype] = full
+        return sizes[kype]
+
+    def decode(kype: str, expr: str) -> str:
+        if kype == 'byte':
+            return f'{expr}[0]'
+        return f'{kype}.decode({expr})'
+
+    def encode(kype: str, expr: str) -> str:
+        if kype == 'byte':
+            return f'bytearray([{expr}])'
+        return f'{kype}.encode({expr})'
+
+    src = []
+    src.append('# Generated by pyckb.schema, do not edit.')
+    src.append('import pyckb.molecule')
+    src.append('import pyckb.objectdict')
+    src.append('import struct')
+    for decl in decls:
+        kype = decl['name']
+        assert kype != 'byte', 'schema: byte is reserved'
+        src.append('')
+        src.append('')
+        src.append(f'class {kype}:')
+        match decl['kind']:
+            case 'array':
+                item = decl['item']
+                lens = decl['size']
+                step = size(item)
+                full = size(kype)
+                src.append('    @classmethod')
+                if item == 'byte':
+                    src.append('    def decode(cls, buffer: bytearray) -> bytearray:')
+                    src.append(f'        assert len(buffer) == {full}')
+                    src.append('        return bytearray(buffer)')
+                else:
+                    src.append('    def decode(cls, buffer: bytearray) -> list:')
+                    src.append(f'        assert len(buffer) == {full}')
+                    elem = decode(item, f'buffer[i:i + {step}]')
+                    src.append(f'        return [{elem} for i in range(0, {full}, {step})]')
+                src.append('')
+                src.append('    @classmethod')
+                if item == 'byte':
+                    src.append('    def encode(cls, value: bytearray) -> bytearray:')
+                    src.append(f'        assert len(value) == {full}')
+                    src.append('        return bytearray(value)')
+                else:
+                    src.append('    def encode(cls, value: list) -> bytearray:')
+                    src.append(f'        assert len(value) == {lens}')
+                    src.append('        r = bytearray()')
+                    src.append('        for e in value:')
+                    src.append(f'            r.extend({encode(item, "e")})')
+                    src.append('        return r')
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def size(cls) -> int:')
+                src.append(f'        return {full}')
+            case 'struct':
+                full = size(kype)
+                src.append('    @classmethod')
+                src.append('    def decode(cls, buffer: bytearray) -> pyckb.objectdict.ObjectDict:')
+                src.append(f'        assert len(buffer) == {full}')
+                src.append('        return pyckb.objectdict.ObjectDict({')
+                offset = 0
+                for field, item in decl['fields']:
+                    step = size(item)
+                    assert step is not None
+                    if item == 'byte':
+                        src.append(f'            {field!r}: buffer[{offset}],')
+                    elif table[item]['kind'] == 'array' and table[item]['item'] == 'byte':
+                        src.append(f'            {field!r}: buffer[{offset}:{offset + step}],')
+                    else:
+                        src.append(f'            {field!r}: {item}.decode(buffer[{offset}:{offset + step}]),')
+                    offset += step
+                src.append('        })')
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def encode(cls, value: dict) -> bytearray:')
+                src.append('        r = bytearray()')
+                for field, item in decl['fields']:
+                    if item == 'byte':
+                        src.append(f'        r.append(value[{field!r}])')
+                    else:
+                        src.append(f'        r.extend({item}.encode(value[{field!r}]))')
+                src.append('        return r')
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def size(cls) -> int:')
+                src.append(f'        return {full}')
+            case 'vector':
+                item = decl['item']
+                step = size(item)
+                if item == 'byte':
+                    # Fixvec of bytes, aka Bytes.
+                    src.append('    @classmethod')
+                    src.append('    def decode(cls, buffer: bytearray) -> bytearray:')
+                    src.append("        assert int.from_bytes(buffer[:4], 'little') == len(buffer) - 4")
+                    src.append('        return buffer[4:]')
+                    src.append('')
+                    src.append('    @classmethod')
+                    src.append('    def encode(cls, value: bytearray) -> bytearray:')
+                    src.append("        return bytearray(len(value).to_bytes(4, 'little')) + value")
+                elif step is not None:
+                    src.append('    @classmethod')
+                    src.append('    def decode(cls, buffer: bytearray) -> list:')
+                    src.append("        nums = int.from_bytes(buffer[:4], 'little')")
+                    src.append(f'        assert len(buffer) == 4 + nums * {step}')
+                    elem = decode(item, f'buffer[i:i + {step}]')
+                    src.append(f'        return [{elem} for i in range(4, len(buffer), {step})]')
+                    src.append('')
+                    src.append('    @classmethod')
+                    src.append('    def encode(cls, value: list) -> bytearray:')
+                    src.append("        r = bytearray(len(value).to_bytes(4, 'little'))")
+                    src.append('        for e in value:')
+                    src.append(f'            r.extend({encode(item, "e")})')
+                    src.append('        return r')
+                else:
+                    src.append('    @classmethod')
+                    src.append('    def decode(cls, buffer: bytearray) -> list:')
+                    src.append(f'        return [{decode(item, "e")} for e in pyckb.molecule.Split.decode(buffer)]')
+                    src.append('')
+                    src.append('    @classmethod')
+                    src.append('    def encode(cls, value: list) -> bytearray:')
+                    src.append(f'        return pyckb.molecule.Split.encode([{encode(item, "e")} for e in value])')
+            case 'table':
+                fields = decl['fields']
+                nums = len(fields)
+                src.append('    @classmethod')
+                src.append('    def decode(cls, buffer: bytearray) -> pyckb.objectdict.ObjectDict:')
+                src.append("        assert len(buffer) == int.from_bytes(buffer[:4], 'little')")
+                if nums == 0:
+                    src.append('        return pyckb.objectdict.ObjectDict({})')
+                else:
+                    # Read the whole header in one go. Extra fields appended by newer schema versions are ignored.
+                    src.append("        size = int.from_bytes(buffer[4:8], 'little')")
+                    src.append('        assert size % 4 == 0')
+                    src.append('        assert size <= len(buffer)')
+                    src.append(f'        assert size // 4 - 1 >= {nums}')
+                    src.append(f"        head = struct.unpack_from('<{nums}I', buffer, 4)")
+                    # The last field ends at the next field if there are extra fields, otherwise at the end of buffer.
+                    src.append('        last = len(buffer)')
+                    src.append(f'        if head[0] != {4 + 4 * nums}:')
+                    src.append(f"            last = int.from_bytes(buffer[{4 + 4 * nums}:{8 + 4 * nums}], 'little')")
+                    src.append('        tail = head[1:] + (last,)')
+                    # Offsets must be in order and inside the buffer, same as pyckb.molecule.Split.
+                    src.append('        assert all([a <= b for a, b in zip(head, tail)])')
+                    src.append('        assert last <= len(buffer)')
+                    src.append('        return pyckb.objectdict.ObjectDict({')
+                    for i, (field, item) in enumerate(fields):
+                        src.append(f'            {field!r}: {decode(item, f"buffer[head[{i}]:tail[{i}]]")},')
+                    src.append('        })')
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def encode(cls, value: dict) -> bytearray:')
+                src.append('        return pyckb.molecule.Split.encode([')
+                for field, item in fields:
+                    src.append(f'            {encode(item, f"value[{field!r}]")},')
+                src.append('        ])')
+            case 'option':
+                item = decl['item']
+                src.append('    @classmethod')
+                src.append('    def decode(cls, buffer: bytearray) -> typing.Any:')
+                src.append(f'        return {decode(item, "buffer")} if len(buffer) > 0 else None')
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def encode(cls, value: typing.Any) -> bytearray:')
+                src.append(f'        return {encode(item, "value")} if value is not None else bytearray()')
+            case 'union':
+                items = decl['items']
+                for item, _ in items:
+                    assert item != 'byte', f'schema: union {kype} can not contain byte'
+                    assert item in table, f'schema: undefined type {item}'
+                src.append('    @classmethod')
+                src.append('    def decode(cls, buffer: bytearray) -> tuple:')
+                src.append("        item_id = int.from_bytes(buffer[:4], 'little')")
+                src.append('        match item_id:')
+                for item, item_id in items:
+                    src.append(f'            case {item_id}:')
+                    src.append(f'                return {item!r}, {item}.decode(buffer[4:])')
+                src.append('            case _:')
+                src.append("                assert False, f'schema: unknown union item {item_id}'")
+                src.append('')
+                src.append('    @classmethod')
+                src.append('    def encode(cls, value: tuple) -> bytearray:')
+                src.append('        match value[0]:')
+                for item, item_id in items:
+                    src.append(f'            case {item!r}:')
+                    head = f"bytearray(({item_id}).to_bytes(4, 'little'))"
+                    src.append(f'                return {head} + {item}.encode(value[1])')
+                src.append('            case _:')
+                src.append("                assert False, f'schema: unknown union item {value[0]}'")
+    for decl in decls:
+        size(decl['name'])
+    if any([e['kind'] == 'option' for e in decls]):
+        src.insert(4, 'import typing')
+    src.append('')
+    return '\n'.join(src)
+
+
+def imports(path: str, seen: set[str] | None = None) -> list[str]:
+    # Collect the schema file and all files it imports, dependencies come first.
+    seen = seen if seen is not None else set()
+    path = os.path.abspath(path)
+    if path in seen:
+        return []
+    seen.add(path)
+    r = []
+    with open(path) as f:
+        text = f.read()
+    for e in re.finditer(r'^\s*import\s+([^;]+);', text, flags=re.MULTILINE):
+        name = e.group(1).strip().strip('"')
+        r.extend(imports(os.path.join(os.path.dirname(path), name + '.mol'), seen))
+    r.append(path)
+    return r
+
+
+def build(text: str, prefix: str | None = None) -> types.ModuleType:
+    # Generate the codecs for the schema text, or reuse the cached ones.
+    text = re.sub(r'^\s*import\s+[^;]+;', '', text, flags=re.MULTILINE)
+    key = hashlib.sha256(f'{version}\n{text}'.encode()).hexdigest()
+    root = prefix if prefix is not None else cache
+    path = os.path.join(root, f'schema_{key[:32]}.py')
+    if not os.path.exists(path):
+        os.makedirs(root, exist_ok=True)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            f.write(generate(parse(text)))
+        os.replace(temp, path)
+    spec = importlib.util.spec_from_file_location(f'pyckb_schema_{key[:32]}', path)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load(path: str, prefix: str | None = None) -> types.ModuleType:
+    # Load a schema file, imported schema files are resolved relative to it.
+    text = []
+    for e in imports(path):
+        with open(e) as f:
+            text.append(f.read())
+    return build('\n'.join(text), prefix)
+
+
+def loads(text: str, prefix: str | None = None) -> types.ModuleType:
+    # Load a schema from text, it must not contain import statements.
+    assert re.search(r'^\s*import\s', text, flags=re.MULTILINE) is None
+    return build(text, prefix)
@@ -1,22 +1,16 @@
 import json
+import pyckb.cellset
 import pyckb.core
 import subprocess
-
-
-class Cell:
-    # Define a class to represent a ckb cell, which is a basic unit of data storage in the ckb blockchain.
-
-    def __init__(self, out_point: pyckb.core.OutPoint, cell_output: pyckb.core.CellOutput, data: bytearray) -> None:
-        self.out_point = out_point
-        self.cell_output = cell_output
-        self.data = data
+# Cell lives in pyckb.cellset, it is kept here for existing users of pyckb.unittest.Cell.
+from pyckb.cellset import Cell
 
 
 class Resource:
     # Define a class to manage resources, primarily cells.
 
     def __init__(self) -> None:
-        self.cell: dict[pyckb.core.OutPoint, Cell] = {}
+        self.cell = pyckb.cellset.CellSet()
         self.cell_outpoint_hash = bytearray(32)
         self.cell_outpoint_incr = 0
 
@@ -26,20 +20,20 @@ class Resource:
         lock: pyckb.core.Script,
         type: pyckb.core.Script | None,
         data: bytearray,
-    ) -> Cell:
+    ) -> pyckb.cellset.Cell:
         # Create a new cell with specified parameters and store it in the resource.
         cell_out_point = pyckb.core.OutPoint(self.cell_outpoint_hash, self.cell_outpoint_incr)
         cell_output = pyckb.core.CellOutput(capacity, lock, type)
-        cell_meta = Cell(cell_out_point, cell_output, data)
-        self.cell[cell_out_point] = cell_meta
+        cell_meta = pyckb.cellset.Cell(cell_out_point, cell_output, data)
+        self.cell.add(cell_out_point, cell_output, data)
         self.cell_outpoint_incr += 1
         return cell_meta
 
-    def create_cell_dep(self, cell: Cell, dep_type: int) -> pyckb.core.CellDep:
+    def create_cell_dep(self, cell: pyckb.cellset.Cell, dep_type: int) -> pyckb.core.CellDep:
         # Create a cell dependency referencing an existing cell.
         return pyckb.core.CellDep(cell.out_point, dep_type)
 
-    def create_cell_input(self, cell: Cell) -> pyckb.core.CellInput:
+    def create_cell_input(self, cell: pyckb.cellset.Cell) -> pyckb.core.CellInput:
         # Create an input referencing an existing cell.
         return pyckb.core.CellInput(0, cell.out_point)
 
@@ -52,11 +46,11 @@ class Resource:
         # Create a cell output with specified parameters.
         return pyckb.core.CellOutput(capacity, lock, type)
 
-    def create_script_by_data(self, cell: Cell, args: bytearray) -> pyckb.core.Script:
+    def create_script_by_data(self, cell: pyckb.cellset.Cell, args: bytearray) -> pyckb.core.Script:
         # Create a script using the hash of a cell's data as the code hash.
         return pyckb.core.Script(pyckb.core.hash(cell.data), pyckb.core.script_hash_type_data2, args)
 
-    def create_script_by_type(self, cell: Cell, args: bytearray) -> pyckb.core.Script:
+    def create_script_by_type(self, cell: pyckb.cellset.Cell, args: bytearray) -> pyckb.core.Script:
         # Create a script using the hash of a cell's type script as the code hash.
         assert cell.cell_output.kype is not None
         return pyckb.core.Script(cell.cell_output.kype.hash(), pyckb.core.script_hash_type_type, args)
@@ -1,9 +1,10 @@
 import itertools
 import json
-import math
+import pyckb.cellset
 import pyckb.config
 import pyckb.denomination
 import pyckb.core
+import pyckb.dao
 import pyckb.rpc
 import typing
 
@@ -16,10 +17,14 @@ class WalletTransactionAnalyzer:
         # Make sure the transaction fee is less than 1 CKB. This is a rough check, but works well in most cases.
         sender_capacity = 0
         output_capacity = 0
+        # Look up all the input transactions in a single batch request, each distinct transaction once.
+        tx_hashes = list(dict.fromkeys(['0x' + e.previous_output.tx_hash.hex() for e in self.tx.raw.inputs]))
+        origins = dict(zip(tx_hashes, pyckb.rpc.get_transactions_batch(tx_hashes)))
         for e in self.tx.raw.inputs:
             out_point = e.previous_output
-            result = pyckb.rpc.get_transaction('0x' + out_point.tx_hash.hex())
-            origin = pyckb.core.CellOutput.rpc_decode(result['transaction']['outputs'][out_point.index])
+            result = origins['0x' + out_point.tx_hash.hex()]
+            assert not isinstance(result, Exception)
+            origin = result['transaction'].raw.outputs[out_point.index]
             sender_capacity += origin.capacity
         for e in self.tx.raw.outputs:
             output_capacity += e.capacity
@@ -79,6 +84,8 @@ class Wallet:
             pyckb.core.hash(self.pubkey.sec())[:20]
         )
         self.addr = self.script.addr()
+        # An optional local view of the live cells, see livecell_set.
+        self.cells: pyckb.cellset.CellSet | None = None
 
     def __repr__(self) -> str:
         return json.dumps(self.json())
@@ -109,7 +116,28 @@ class Wallet:
             }
         })
 
+    def livecell_input(self) -> typing.Generator[tuple[pyckb.core.OutPoint, int]]:
+        # Candidate inputs for coin selection as (out point, capacity). With a local cell set attached, the largest
+        # cells are offered first and no rpc is made, otherwise the cells come from the indexer.
+        if self.cells is not None:
+            for e in self.cells.order(reverse=True):
+                yield e.out_point, e.cell_output.capacity
+            return
+        for e in self.livecell():
+            yield pyckb.core.OutPoint.rpc_decode(e['out_point']), int(e['output']['capacity'], 16)
+
+    def livecell_set(self) -> pyckb.cellset.CellSet:
+        # Load all live cells into a compact cell set. Attach it to self.cells to select inputs locally.
+        interner = pyckb.core.Interner()
+        r = pyckb.cellset.CellSet(interner)
+        for e in self.livecell():
+            e = pyckb.rpc.cell_decode(e, interner)
+            r.add(e['out_point'], e['output'], e['output_data'])
+        return r
+
     def capacity(self) -> int:
+        if self.cells is not None:
+            return self.cells.capacity()
         return int(pyckb.rpc.get_cells_capacity({
             'script': self.script.rpc(),
             'script_type': 'lock',
@@ -118,6 +146,20 @@ class Wallet:
             }
         })['capacity'], 16)
 
+    def send_transaction(self, tx: pyckb.core.Transaction) -> str:
+        # Send the transaction and update the local cell set: its inputs are spent, and its outputs that livecell
+        # would return, locked by this wallet with no type script, become live.
+        hash = pyckb.rpc.send_transaction(tx)
+        if self.cells is not None:
+            for e in tx.raw.inputs:
+                if e.previous_output in self.cells:
+                    self.cells.remove(e.previous_output)
+            tx_hash = bytearray.fromhex(hash[2:])
+            for i, e in enumerate(tx.raw.outputs):
+                if e.lock == self.script and e.kype is None:
+                    self.cells.add(pyckb.core.OutPoint(tx_hash, i), e, tx.raw.outputs_data[i])
+        return hash
+
     def transfer(self, script: pyckb.core.Script, capacity: int) -> bytearray:
         assert capacity >= 61 * pyckb.denomination.ckbytes
         assert self.capacity() > capacity
@@ -133,9 +175,7 @@ class Wallet:
         tx.raw.outputs_data.append(bytearray())
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 256):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 256):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -145,9 +185,9 @@ class Wallet:
         assert change_capacity >= 61 * pyckb.denomination.ckbytes
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def transfer_all(self, script: pyckb.core.Script) -> bytearray:
@@ -160,18 +200,16 @@ class Wallet:
         tx.raw.outputs.append(pyckb.core.CellOutput(accept_capacity, accept_script, None))
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 256):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 256):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
         accept_capacity = sender_capacity - len(tx.molecule()) - 4
         tx.raw.outputs[0].capacity = accept_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def script_deploy(self, script: pyckb.core.Script, data: bytearray) -> bytearray:
@@ -187,9 +225,7 @@ class Wallet:
         tx.raw.outputs_data.append(data)
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 256):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 256):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -199,9 +235,9 @@ class Wallet:
         assert change_capacity >= 61 * pyckb.denomination.ckbytes
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def script_deploy_type_id(self, script: pyckb.core.Script, data: bytearray) -> bytearray:
@@ -218,9 +254,7 @@ class Wallet:
         tx.raw.outputs_data.append(data)
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 256):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 256):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -233,9 +267,9 @@ class Wallet:
         tx.raw.outputs[0].kype.args = pyckb.core.hash(tx.raw.inputs[0].molecule() + bytearray(8))
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def script_update_type_id(
@@ -244,8 +278,8 @@ class Wallet:
         data: bytearray,
         out_point: pyckb.core.OutPoint
     ) -> bytearray:
-        result = pyckb.rpc.get_transaction('0x' + out_point.tx_hash.hex())
-        origin = pyckb.core.CellOutput.rpc_decode(result['transaction']['outputs'][out_point.index])
+        result = pyckb.rpc.get_transaction_decode('0x' + out_point.tx_hash.hex())
+        origin = result['transaction'].raw.outputs[out_point.index]
         assert origin.kype is not None
         assert origin.kype.code_hash == pyckb.core.type_id_code_hash
         assert origin.kype.hash_type == pyckb.core.type_id_hash_type
@@ -263,9 +297,7 @@ class Wallet:
         tx.raw.outputs_data.append(data)
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 255):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 255):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -275,9 +307,9 @@ class Wallet:
         assert change_capacity >= 61 * pyckb.denomination.ckbytes
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def dao_deposit(self, capacity: int) -> bytearray:
@@ -302,9 +334,7 @@ class Wallet:
         tx.raw.outputs_data.append(bytearray(8))
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 256):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 256):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -314,16 +344,16 @@ class Wallet:
         assert change_capacity >= 61 * pyckb.denomination.ckbytes
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def dao_prepare(self, out_point: pyckb.core.OutPoint) -> bytearray:
         # https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0023-dao-deposit-withdraw/0023-dao-deposit-withdraw.md#withdraw-phase-1
-        result = pyckb.rpc.get_transaction('0x' + out_point.tx_hash.hex())
-        number = int(pyckb.rpc.get_header(result['tx_status']['block_hash'])['number'], 16)
-        origin = pyckb.core.CellOutput.rpc_decode(result['transaction']['outputs'][out_point.index])
+        result = pyckb.rpc.get_transaction_decode('0x' + out_point.tx_hash.hex())
+        number = pyckb.rpc.get_header_decode(result['tx_status']['block_hash']).raw.number
+        origin = result['transaction'].raw.outputs[out_point.index]
         assert origin.kype is not None
         assert origin.kype.code_hash == pyckb.config.current.script.dao.code_hash
         assert origin.kype.hash_type == pyckb.config.current.script.dao.hash_type
@@ -344,9 +374,7 @@ class Wallet:
         tx.raw.outputs_data.append(bytearray(number.to_bytes(8, 'little')))
         tx.raw.outputs_data.append(bytearray())
         tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
-        for cell in itertools.islice(self.livecell(), 255):
-            cell_out_point = pyckb.core.OutPoint.rpc_decode(cell['out_point'])
-            cell_capacity = int(cell['output']['capacity'], 16)
+        for cell_out_point, cell_capacity in itertools.islice(self.livecell_input(), 255):
             cell_input = pyckb.core.CellInput(0, cell_out_point)
             sender_capacity += cell_capacity
             tx.raw.inputs.append(cell_input)
@@ -356,40 +384,32 @@ class Wallet:
         assert change_capacity >= 61 * pyckb.denomination.ckbytes
         tx.raw.outputs[1].capacity = change_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, None, None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def dao_extract(self, out_point: pyckb.core.OutPoint) -> bytearray:
         # https://github.com/nervosnetwork/rfcs/blob/master/rfcs/0023-dao-deposit-withdraw/0023-dao-deposit-withdraw.md#withdraw-phase-2
-        result = pyckb.rpc.get_transaction('0x' + out_point.tx_hash.hex())
-        origin = pyckb.core.CellOutput.rpc_decode(result['transaction']['outputs'][out_point.index])
+        result = pyckb.rpc.get_transaction_decode('0x' + out_point.tx_hash.hex())
+        origin = result['transaction'].raw.outputs[out_point.index]
         assert origin.kype is not None
         assert origin.kype.code_hash == pyckb.config.current.script.dao.code_hash
         assert origin.kype.hash_type == pyckb.config.current.script.dao.hash_type
         assert origin.kype.args == bytearray()
-        deposit_block_number_byte = bytearray.fromhex(result['transaction']['outputs_data'][out_point.index][2:])
+        deposit_block_number_byte = result['transaction'].raw.outputs_data[out_point.index]
         deposit_block_number = int.from_bytes(deposit_block_number_byte, 'little')
-        deposit_block_header = pyckb.core.Header.rpc_decode(pyckb.rpc.get_header_by_number(hex(deposit_block_number)))
+        deposit_block_header = pyckb.rpc.get_header_by_number_decode(hex(deposit_block_number))
         deposit_block_hash = deposit_block_header.hash()
-        deposit_block_epoch = pyckb.core.epoch_decode(deposit_block_header.raw.epoch)
-        deposit_block_epoch_float = deposit_block_epoch[0] + deposit_block_epoch[1] / deposit_block_epoch[2]
-        deposit_dao_ar = pyckb.core.dao_decode(deposit_block_header.raw.dao)[1]
         prepare_block_hash = bytearray.fromhex(result['tx_status']['block_hash'][2:])
-        prepare_block_header = pyckb.core.Header.rpc_decode(pyckb.rpc.get_header('0x' + prepare_block_hash.hex()))
-        prepare_block_epoch = pyckb.core.epoch_decode(prepare_block_header.raw.epoch)
-        prepare_block_epoch_float = prepare_block_epoch[0] + prepare_block_epoch[1] / prepare_block_epoch[2]
-        prepare_dao_ar = pyckb.core.dao_decode(prepare_block_header.raw.dao)[1]
-        extract_since_delay = math.ceil((prepare_block_epoch_float - deposit_block_epoch_float) / 180) * 180
-        extract_since_epoch = pyckb.core.epoch_encode(
-            deposit_block_epoch[0] + extract_since_delay,
-            deposit_block_epoch[1],
-            deposit_block_epoch[2],
+        prepare_block_header = pyckb.rpc.get_header_decode('0x' + prepare_block_hash.hex())
+        extract_since = pyckb.dao.since(deposit_block_header.raw.epoch, prepare_block_header.raw.epoch)
+        sender_capacity = pyckb.dao.maximum_withdraw(
+            origin.capacity,
+            pyckb.dao.occupied(origin, deposit_block_number_byte),
+            pyckb.core.dao_decode(deposit_block_header.raw.dao)[1],
+            pyckb.core.dao_decode(prepare_block_header.raw.dao)[1],
         )
-        extract_since = 0x2000000000000000 + extract_since_epoch
-        occupy_capacity = 102 * pyckb.denomination.ckbytes
-        sender_capacity = (origin.capacity - occupy_capacity) * prepare_dao_ar // deposit_dao_ar + occupy_capacity
         accept_capacity = 0
         accept_script = self.script
         tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
@@ -404,9 +424,9 @@ class Wallet:
         accept_capacity = sender_capacity - len(tx.molecule()) - 4
         tx.raw.outputs[0].capacity = accept_capacity
         sg = self.prikey.sign(tx.hash_sighash_all(0, []))
-        tx.witnesses[0] = pyckb.core.WitnessArgs(sg, bytearray(8), None).molecule()
+        pyckb.core.WitnessArgs.patch_lock(tx.witnesses[0], sg)
         WalletTransactionAnalyzer(tx).analyze()
-        hash = pyckb.rpc.send_transaction(tx.rpc())
+        hash = self.send_transaction(tx)
         return bytearray.fromhex(hash[2:])
 
     def dao_livecell(self) -> typing.Generator:
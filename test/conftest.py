@@ -0,0 +1,59 @@
+import http.server
+import json
+import pyckb
+import pytest
+import threading
+import typing
+
+
+@pytest.fixture
+def rpc_server() -> typing.Generator[typing.Callable[[typing.Callable], list]]:
+    # Start a local json-rpc server and point the develop config at it, until the test ends. The handler maps a decoded
+    # request body to the response object. If it returns None, the connection is closed without a response, and if it
+    # returns an int, that http status is sent with an empty body. The returned list collects the client address of
+    # every request.
+    current = pyckb.config.current
+    url = pyckb.config.develop.rpc.url
+    servers: list[http.server.ThreadingHTTPServer] = []
+
+    def serve(handle: typing.Callable[[typing.Any], typing.Any]) -> list:
+        peer = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['content-length'])))
+                peer.append(self.client_address)
+                resp = handle(body)
+                if resp is None:
+                    self.close_connection = True
+                    return
+                if isinstance(resp, int):
+                    self.send_response(resp)
+                    self.send_header('content-length', '0')
+                    self.end_headers()
+                    return
+                data = json.dumps(resp).encode()
+                self.send_response(200)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        pyckb.config.develop.rpc.url = f'http://127.0.0.1:{server.server_address[1]}'
+        pyckb.config.current = pyckb.config.develop
+        return peer
+    try:
+        yield serve
+    finally:
+        pyckb.config.develop.rpc.url = url
+        pyckb.config.current = current
+        for e in servers:
+            e.shutdown()
+            e.server_close()
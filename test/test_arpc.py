@@ -0,0 +1,71 @@
+import asyncio
+import pyckb
+import pytest
+import time
+
+
+def test_async_limits():
+    async def main():
+        rate = pyckb.rate.AsyncLimits(4, 0.1)
+        s = time.time()
+        await asyncio.gather(*[rate.wait(1) for _ in range(12)])
+        return time.time() - s
+    # The first 4 tokens are available at once, the other 8 take two periods.
+    assert 0.15 < asyncio.run(main()) < 0.5
+
+
+def test_call(rpc_server):
+    def handle(body: dict | list) -> dict | list:
+        if isinstance(body, list):
+            return [{'id': e['id'], 'jsonrpc': '2.0', 'result': e['params']} for e in reversed(body)]
+        return {'id': body['id'], 'jsonrpc': '2.0', 'result': body['params']}
+    peer = rpc_server(handle)
+
+    async def main():
+        r = await asyncio.gather(*[pyckb.arpc.call('echo', [i]) for i in range(64)])
+        assert r == [[i] for i in range(64)]
+        assert await pyckb.arpc.batch([('echo', [0]), ('echo', [1])]) == [[0], [1]]
+        await pyckb.arpc.transport().close()
+    asyncio.run(main())
+    # Connections are reused, no more than the pool size are opened.
+    assert len(set(peer)) <= pyckb.config.develop.rpc.pool
+
+
+def test_recv():
+    async def recv(data: bytes) -> tuple[bytes, bool]:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await pyckb.arpc.Transport('http://127.0.0.1:8114', 1, (1, 1)).recv(reader)
+    r = asyncio.run(recv(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: identity, Chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n'))
+    assert r == (b'hello', True)
+    r = asyncio.run(recv(b'HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 5\r\n\r\nhello'))
+    assert r == (b'hello', False)
+    with pytest.raises(Exception, match='http 503'):
+        asyncio.run(recv(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 4\r\n\r\nbusy'))
+    assert pyckb.arpc.Transport('http://[::1]:8114', 1, (1, 1)).netloc == '[::1]:8114'
+
+
+def test_retry(rpc_server):
+    count = []
+
+    def handle(body: dict) -> dict | None:
+        count.append(body['method'])
+        if body['method'] == 'echo':
+            return {'id': body['id'], 'jsonrpc': '2.0', 'result': body['params']}
+        # Close the connection without an answer, like a server that went away.
+        return None
+    rpc_server(handle)
+
+    async def main():
+        await pyckb.arpc.call('echo', [0])
+        with pytest.raises(ConnectionError):
+            await pyckb.arpc.call('drop', [])
+        await pyckb.arpc.call('echo', [0])
+        with pytest.raises(ConnectionError):
+            await pyckb.arpc.call('send_transaction', [{}, 'passthrough'])
+        await pyckb.arpc.transport().close()
+    asyncio.run(main())
+    # A call is tried on the idle connection and again on a new one, a transaction is sent once.
+    assert count.count('drop') == 2
+    assert count.count('send_transaction') == 1
@@ -0,0 +1,24 @@
+import pyckb
+import random
+
+
+def test_checksum():
+    # Test vectors from bip-173 and bip-350.
+    assert pyckb.bech32.decode('a', 0, 'A12UEL5L') == bytearray()
+    assert pyckb.bech32.decode('abcdef', 0, 'abcdef1qpzry9x8gf2tvdw0s3jn54khce6mua7lmqqqxw') == bytearray(range(32))
+    assert pyckb.bech32.decode('a', 1, 'A1LQFN3A') == bytearray()
+    data = bytearray(range(31, -1, -1))
+    assert pyckb.bech32.decode('abcdef', 1, 'abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx') == data
+    assert pyckb.bech32.encode('abcdef', 1, data) == 'abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx'
+
+
+def test_re_arrange():
+    r = random.Random(0)
+    for n in range(64):
+        data = bytearray(r.randbytes(n))
+        five = pyckb.bech32.re_arrange_5(data)
+        assert len(five) == (n * 8 + 4) // 5
+        assert max(five, default=0) <= 0x1f
+        assert pyckb.bech32.re_arrange_8(five) == data
+        addr = pyckb.bech32.encode_addr('ckb', data, True)
+        assert pyckb.bech32.decode_addr('ckb', addr) == data
@@ -0,0 +1,79 @@
+import itertools
+import pyckb
+
+items = [pyckb.core.hash(bytearray([i])) for i in range(9)]
+merge = pyckb.cbmt.merge
+
+
+def test_root():
+    assert pyckb.cbmt.root([]) == bytearray(32)
+    assert pyckb.cbmt.root(items[:1]) == items[0]
+    assert pyckb.cbmt.root(items[:2]) == merge(items[0], items[1])
+    assert pyckb.cbmt.root(items[:3]) == merge(merge(items[1], items[2]), items[0])
+    assert pyckb.cbmt.root(items[:5]) == merge(
+        merge(merge(items[3], items[4]), items[0]),
+        merge(items[1], items[2]),
+    )
+
+
+def test_proof():
+    for n in range(1, 8):
+        tree = pyckb.cbmt.Tree(items[:n])
+        for k in range(1, n + 1):
+            for leaves in itertools.combinations(range(n), k):
+                proof = tree.proof(list(leaves))
+                assert proof.root([items[e] for e in leaves]) == tree.root()
+                assert pyckb.cbmt.Proof.rpc_decode(proof.rpc()) == proof
+                if n > 1:
+                    assert proof.root([items[e] for e in leaves][:-1] + [bytearray(32)]) != tree.root()
+
+
+def test_transactions_root():
+    # Mainnet block 0x388.
+    def tx(since, cell_deps, previous_output, outputs, witness):
+        tx_hash, index = previous_output
+        return pyckb.core.Transaction(pyckb.core.RawTransaction(
+            0,
+            [pyckb.core.CellDep(pyckb.core.OutPoint(bytearray.fromhex(e), 0), 1) for e in cell_deps],
+            [],
+            [pyckb.core.CellInput(since, pyckb.core.OutPoint(bytearray.fromhex(tx_hash), index))],
+            [pyckb.core.CellOutput(e[0], pyckb.core.Script(
+                bytearray.fromhex('9bd7e06f3ecf4be0f2fcd2188b23f1b9fcc88e5d4b65a8637b17723bbda3cce8'),
+                pyckb.core.script_hash_type_type,
+                bytearray.fromhex(e[1]),
+            ), None) for e in outputs],
+            [bytearray() for _ in outputs],
+        ), [bytearray.fromhex(witness)])
+    dep = '71a7ba8fc96349fea0ed3a5c47992e3b4084b031a42264a018e0072e8172e46c'
+    txs = [
+        tx(0x388, [], ('00' * 32, 0xffffffff), [(0x1ad925c507, '0a486fb8f6fe60f76f001d6372da41be91172259')], ''.join([
+            '5a0000000c00000055000000490000001000000030000000310000009bd7e06f3ecf4be0f2fcd2188b23f1b9fcc88e5d4b65',
+            'a8637b17723bbda3cce801140000000a486fb8f6fe60f76f001d6372da41be911722590100000000',
+        ])),
+        tx(0, [dep], ('b4aa8c05207ec3e67e6408473cd93bdb89780864446bc7d6b6812b539c33d096', 1), [
+            (0x453b118f700, '04e058890224cbb41e9fed2b10ce3ad20f014cda'),
+            (0x4bc772aa88c, '6d9e5654ec5c0435dedd7fc869b66ba47eb60208'),
+        ], ''.join([
+            '5500000010000000550000005500000041000000f0ac95a3667c757b7e08783f7f0f78db47dfcd76511e42bf4f0143550',
+            '7fda0b8210a521fa12012aa70921f6e6e00dd2a7c1296512632f1dfb26957d9b409284701',
+        ])),
+        tx(0, [dep], ('3ce938e5b12f707a0dd3122604f844509192bc6cb21377389ec8509683380839', 1), [
+            (0xba43b7400, '3ff943b23be06ac76ac9de7c02ec0ede8286d47c'),
+            (0x6fc2336d0, '56b1a3bed66c86b40151f2ba1bfe296032dd307b'),
+        ], ''.join([
+            '55000000100000005500000055000000410000000881853578e3ca9a3cb7a0faf5ba6b15f2a479c16f40e73f2e9b4552f',
+            '900913c25da1d4ba34d16442e2c80d3ce62f72c7e0778a05f058e081c094ef4a865900700',
+        ])),
+    ]
+    assert txs[1].raw.hash().hex() == '47a1a0dc8308902a4b4f2a921c0199dfc2cfa23a163f26398d8dc1f3529b2a51'
+    transactions_root = bytearray.fromhex('b7152b63347f20ac999a51a5a80e0a80c8a703dad686c2a65f084c9acd9f596c')
+    header = pyckb.core.Header(pyckb.core.RawHeader(
+        0, 0, 0, 0, 0, bytearray(32), transactions_root, bytearray(32), bytearray(32), bytearray(32)), 0)
+    block = pyckb.core.Block(header, [], txs, [])
+    assert pyckb.cbmt.transactions_root_block(block) == transactions_root
+    assert pyckb.cbmt.transactions_root_block(pyckb.core.BlockLazy(block.molecule())) == transactions_root
+    txs_hash = [e.raw.hash() for e in txs]
+    witnesses_root = pyckb.cbmt.root([e.hash_witness() for e in txs])
+    proof = pyckb.cbmt.Tree(txs_hash).proof([1, 2])
+    assert pyckb.cbmt.verify(proof, witnesses_root, transactions_root, [txs_hash[2], txs_hash[1]])
+    assert not pyckb.cbmt.verify(proof, witnesses_root, transactions_root, [txs_hash[0], txs_hash[1]])
@@ -0,0 +1,44 @@
+import pyckb
+import random
+
+
+def test_cellset():
+    r = random.Random(0)
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray(20))
+    kype = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_data1, bytearray([0x01]))
+    cells = pyckb.cellset.CellSet()
+    plain = {}
+    for i in range(256):
+        out_point = pyckb.core.OutPoint(bytearray(r.randbytes(32)), i)
+        cell_output = pyckb.core.CellOutput(r.randint(61, 1 << 40), lock, kype if i % 3 == 0 else None)
+        data = bytearray(r.randbytes(i % 4))
+        cells.add(out_point, cell_output, data)
+        plain[out_point] = (cell_output, data)
+    assert len(cells.scripts) == 3
+    for out_point in r.sample(list(plain), 128):
+        cells.remove(out_point)
+        del plain[out_point]
+        assert out_point not in cells
+    assert len(cells) == len(plain)
+    assert cells.capacity() == sum([e[0].capacity for e in plain.values()])
+    for out_point, (cell_output, data) in plain.items():
+        assert out_point in cells
+        cell = cells[out_point]
+        assert cell.out_point == out_point
+        assert cell.cell_output == cell_output
+        assert cell.data == data
+    order = [e.cell_output.capacity for e in cells.order()]
+    assert order == sorted([e[0].capacity for e in plain.values()])
+    assert sorted([e.out_point.index for e in cells]) == sorted([e.index for e in plain])
+
+
+def test_cellset_interner():
+    interner = pyckb.core.Interner()
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray(20))
+    pooled = interner.script(pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray(20)))
+    cells = pyckb.cellset.CellSet(interner)
+    cells.add(pyckb.core.OutPoint(bytearray(32), 0), pyckb.core.CellOutput(100, lock, None), bytearray())
+    # Scripts are shared with the interner, and the script of the caller stays mutable.
+    assert cells.scripts[1] is pooled
+    assert len(interner) == 1
+    assert not lock.frozen()
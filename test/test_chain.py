@@ -0,0 +1,72 @@
+import pyckb
+import pytest
+
+# Mainnet header 0x417.
+header = pyckb.core.Header.rpc_decode({
+    'compact_target': '0x1a08a97e',
+    'dao': '0x920c75d0a1a8a12e071127fb0b8723003947ac75871c000000a3e044a53bff06',
+    'epoch': '0x6cf0417000000',
+    'extra_hash': '0x0000000000000000000000000000000000000000000000000000000000000000',
+    'nonce': '0x87829506000005a10000000001470500',
+    'number': '0x417',
+    'parent_hash': '0x664ff8295293522f79db8e421f919aab35f72ce1cd60e7b93e5f1d27977010ee',
+    'proposals_hash': '0x0000000000000000000000000000000000000000000000000000000000000000',
+    'timestamp': '0x16e783b79fd',
+    'transactions_root': '0x445dc8adada6feaf5275f9e31a1e9044588de0eaf73e8afdc21cbf07f79bf87f',
+    'version': '0x0',
+})
+
+
+def chain(size: int) -> list[pyckb.core.Header]:
+    # A chain that starts right after the mainnet header, with an easy target.
+    r = [header]
+    for _ in range(size):
+        e, i, l = pyckb.core.epoch_decode(r[-1].raw.epoch)
+        epoch = pyckb.core.epoch_encode(e, i + 1, l) if i + 1 < l else pyckb.core.epoch_encode(e + 1, 0, 1800)
+        raw = pyckb.core.RawHeader(0, 0x20ffffff, r[-1].raw.timestamp + 8000, r[-1].raw.number + 1, epoch,
+                                   r[-1].hash(), bytearray(32), bytearray(32), bytearray(32), bytearray(32))
+        r.append(pyckb.core.Header(raw, 0))
+    return r[1:]
+
+
+def test_compact_to_target():
+    assert pyckb.chain.compact_to_target(0x1a08a97e) == 0x08a97e << 184
+    assert pyckb.chain.compact_to_target(0x03123456) == 0x123456
+    assert pyckb.chain.compact_to_target(0x02123456) == 0x1234
+    assert pyckb.chain.compact_to_target(0x2000ffff) == 0xffff << 232
+    with pytest.raises(AssertionError):
+        pyckb.chain.compact_to_target(0x2100ffff)
+
+
+def test_pow_message():
+    assert header.hash().hex() == 'c3ffedc5143d516ab35993667a8e243491b879ae19b8605d74b20f08a4b72b52'
+    assert header.raw.hash().hex() == '633dd3a34be2355055b020ea49fe01d8666a4756bda4aac0b6f02746fcdf398e'
+    assert pyckb.chain.pow_message(header)[32:].hex() == '0005470100000000a105000006958287'
+
+
+def test_verify_pow():
+    assert pyckb.chain.verify_pow(header)
+    assert pyckb.eaglesong.eaglesong(pyckb.chain.pow_message(header)).hex().startswith('00000000000006f5')
+    tamper = pyckb.core.Header(header.raw, header.nonce ^ 1)
+    assert not pyckb.chain.verify_pow(tamper)
+    assert not pyckb.chain.verify([tamper])
+
+
+def test_verify():
+    headers = chain(8)
+    assert pyckb.chain.verify(headers, pyckb.core.hash)
+    assert pyckb.chain.verify(headers, pyckb.core.hash, header)
+    assert pyckb.chain.verify(headers, pyckb.core.hash, processes=2)
+    assert not pyckb.chain.verify(headers[:4] + headers[5:], pyckb.core.hash)
+    assert not pyckb.chain.verify(headers[1:], pyckb.core.hash, header)
+    headers[4].raw.compact_target = 0x03000001
+    assert not pyckb.chain.verify(headers[:5], pyckb.core.hash)
+    assert not pyckb.chain.verify(headers[:5], pyckb.core.hash, processes=2)
+
+
+def test_verify_epoch():
+    assert pyckb.chain.verify_epoch(pyckb.core.epoch_encode(1, 5, 10), pyckb.core.epoch_encode(1, 6, 10))
+    assert pyckb.chain.verify_epoch(pyckb.core.epoch_encode(1, 9, 10), pyckb.core.epoch_encode(2, 0, 12))
+    assert not pyckb.chain.verify_epoch(pyckb.core.epoch_encode(1, 5, 10), pyckb.core.epoch_encode(2, 0, 10))
+    assert not pyckb.chain.verify_epoch(pyckb.core.epoch_encode(1, 5, 10), pyckb.core.epoch_encode(1, 6, 12))
+    assert not pyckb.chain.verify_epoch(pyckb.core.epoch_encode(1, 9, 10), pyckb.core.epoch_encode(1, 10, 10))
@@ -1,4 +1,7 @@
+import json
+import pickle
 import pyckb
+import pytest
 import random
 
 
@@ -77,6 +80,11 @@ def test_script():
         bytearray([0x00, 0x01, 0x02, 0x03])
     )
     assert pyckb.core.Script.molecule_decode(script.molecule()) == script
+    # Fields are immutable bytes, they can only be replaced as a whole.
+    with pytest.raises(TypeError):
+        script.args[0] = 0xff
+    script.args = script.args + bytearray([0x04])
+    assert script.args == bytearray([0x00, 0x01, 0x02, 0x03, 0x04])
 
 
 def test_sign():
@@ -91,3 +99,204 @@ def test_witness_args():
         None,
     )
     assert pyckb.core.WitnessArgs.molecule_decode(witness_args.molecule()) == witness_args
+
+
+def test_peek():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01, 0x02, 0x03]))
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.inputs.append(pyckb.core.CellInput(0, pyckb.core.OutPoint(bytearray(32), 0)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(100, lock, None))
+    tx.raw.outputs.append(pyckb.core.CellOutput(200, lock, lock))
+    tx.raw.outputs_data.append(bytearray())
+    tx.raw.outputs_data.append(bytearray())
+    tx.witnesses.append(bytearray([0x00, 0x01]))
+    tx_bin = tx.molecule()
+    assert pyckb.core.Transaction.peek_hash(tx_bin) == tx.raw.hash()
+    assert pyckb.core.Transaction.peek_outputs(tx_bin) == tx.raw.outputs
+    assert pyckb.core.Transaction.peek_outputs_count(tx_bin) == 2
+    assert pyckb.core.Transaction.peek_witnesses(tx_bin) == tx.witnesses
+    output_bin = tx.raw.outputs[1].molecule()
+    assert pyckb.core.CellOutput.peek_capacity(output_bin) == 200
+    assert pyckb.core.CellOutput.peek_lock(output_bin) == lock
+    assert pyckb.core.CellOutput.peek_lock_hash(output_bin) == lock.hash()
+    header = pyckb.core.Header(pyckb.core.RawHeader(
+        0, 0x1a08a97e, 0, 0x388, 0x6cf0388000000, bytearray([1] * 32), bytearray(32), bytearray(32), bytearray(32),
+        bytearray([2] * 32)), 0)
+    header_bin = header.molecule()
+    assert pyckb.core.Header.peek_number(header_bin) == header.raw.number
+    assert pyckb.core.Header.peek_epoch(header_bin) == header.raw.epoch
+    assert pyckb.core.Header.peek_parent_hash(header_bin) == header.raw.parent_hash
+    assert pyckb.core.Header.peek_dao(header_bin) == header.raw.dao
+    block = pyckb.core.Block(header, [], [tx, tx], [])
+    block_bin = block.molecule()
+    assert pyckb.core.Block.peek_header(block_bin) == header
+    assert pyckb.core.Block.peek_transactions_count(block_bin) == 2
+    assert pyckb.core.Block.peek_transaction(block_bin, 1) == tx
+    assert list(pyckb.core.Block.iter_tx_slices(block_bin)) == [tx_bin, tx_bin]
+    block = pyckb.core.BlockV1(header, [], [tx], [], bytearray([3] * 32))
+    block_bin = block.molecule()
+    assert pyckb.core.BlockV1.peek_header(block_bin) == header
+    assert pyckb.core.BlockV1.peek_transactions_count(block_bin) == 1
+    assert pyckb.core.BlockV1.peek_transaction(block_bin, 0) == tx
+    assert list(pyckb.core.BlockV1.iter_tx_slices(block_bin)) == [tx_bin]
+
+
+def test_slots():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01]))
+    assert not hasattr(lock, '__dict__')
+    assert lock.data == bytes(lock.molecule())
+    assert {lock: 1}[pyckb.core.Script.molecule_decode(lock.molecule())] == 1
+    lock.args = bytearray([0x02])
+    assert lock.args == bytearray([0x02])
+    assert lock == pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x02]))
+    out_point = pyckb.core.OutPoint(bytearray([1] * 32), 2)
+    assert len(out_point.data) == 36
+    assert out_point.index == 2
+    with pytest.raises(TypeError):
+        out_point.tx_hash[0] = 0
+    assert {out_point: 1}[pyckb.core.OutPoint(bytearray([1] * 32), 2)] == 1
+    cell_input = pyckb.core.CellInput(0, out_point)
+    assert not hasattr(cell_input, '__dict__')
+
+
+def test_freeze():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01]))
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.inputs.append(pyckb.core.CellInput(0, pyckb.core.OutPoint(bytearray(32), 0)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(100, lock, None))
+    tx.raw.outputs_data.append(bytearray())
+    tx.witnesses.append(bytearray([0x00, 0x01]))
+    tx_copy = pyckb.core.Transaction.molecule_decode(tx.molecule())
+    tx_hash = tx.raw.hash()
+    tx.freeze()
+    assert tx == tx_copy
+    assert tx.raw.hash() == tx_hash
+    assert tx.raw.memo['hash'] == tx_hash
+    assert tx.molecule() == tx_copy.molecule()
+    assert isinstance(tx.raw.inputs, tuple)
+    assert lock.frozen()
+    try:
+        lock.args = bytearray()
+    except AssertionError:
+        pass
+    assert lock.args == bytearray([0x00, 0x01])
+    # Decoding through the class of a frozen record gives a new mutable record.
+    for e in [lock, tx.raw.inputs[0].previous_output, tx]:
+        r = type(e).molecule_decode(e.molecule())
+        assert r == e
+        assert not r.frozen()
+
+
+def test_hash_sighash_all_group():
+    lock_a = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x0a]))
+    lock_b = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x0b]))
+    cells = [
+        pyckb.core.CellOutput(100, lock_a, None),
+        pyckb.core.CellOutput(100, lock_b, None),
+        pyckb.core.CellOutput(100, lock_a, None),
+    ]
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    for i in range(3):
+        tx.raw.inputs.append(pyckb.core.CellInput(0, pyckb.core.OutPoint(bytearray(32), i)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(200, lock_a, None))
+    tx.raw.outputs_data.append(bytearray())
+    tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
+    tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
+    tx.witnesses.append(bytearray([0x02]))
+    tx.witnesses.append(bytearray([0x03]))
+    r = tx.hash_sighash_all_group(cells)
+    assert [(e[0], e[1]) for e in r] == [(0, [2]), (1, [])]
+    for major, other, message in r:
+        assert message == tx.hash_sighash_all(major, other)
+
+
+def test_interner():
+    interner = pyckb.core.Interner()
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01]))
+    output = pyckb.core.CellOutput(100, lock, None)
+    a = pyckb.core.CellOutput.rpc_decode(output.rpc(), interner)
+    b = pyckb.core.CellOutput.rpc_decode(output.rpc(), interner)
+    c = pyckb.core.CellOutput.molecule_decode(output.molecule(), interner)
+    assert a.lock is b.lock
+    assert a.lock is c.lock
+    assert a.lock == lock
+    assert a.lock.frozen()
+    assert len(interner) == 1
+
+
+def test_block_lazy():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01]))
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.inputs.append(pyckb.core.CellInput(0, pyckb.core.OutPoint(bytearray(32), 0)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(100, lock, None))
+    tx.raw.outputs_data.append(bytearray())
+    tx.witnesses.append(bytearray([0x00, 0x01]))
+    header = pyckb.core.Header(pyckb.core.RawHeader(
+        0, 0x1a08a97e, 0, 0x388, 0x6cf0388000000, bytearray(32), bytearray(32), bytearray(32), bytearray(32),
+        bytearray(32)), 0)
+    uncle = pyckb.core.UncleBlock(header, [bytearray(10)])
+    block = pyckb.core.BlockV1(header, [uncle], [tx, tx, tx], [bytearray(10)], bytearray([0x01]))
+    lazy = pyckb.core.BlockLazy(block.molecule())
+    assert lazy.header == header
+    assert len(lazy.transactions) == 3
+    assert lazy.transactions[-1] == tx
+    assert list(lazy.transactions) == [tx, tx, tx]
+    assert lazy.uncles[0] == uncle
+    assert lazy.witnesses(1) == tx.witnesses
+    assert lazy.transactions_hash() == [tx.raw.hash()] * 3
+    assert lazy.proposals == block.proposals
+    assert lazy.extension == block.extension
+    assert lazy.decode() == block
+
+
+def test_pickle():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01]))
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.inputs.append(pyckb.core.CellInput(0, pyckb.core.OutPoint(bytearray(32), 0)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(100, lock, None))
+    tx.raw.outputs_data.append(bytearray())
+    tx.witnesses.append(bytearray([0x00, 0x01]))
+    assert pickle.loads(pickle.dumps(tx)) == tx
+    assert pickle.loads(pickle.dumps(lock)) == lock
+    assert len(pickle.dumps(tx)) < len(tx.molecule()) + 128
+    tx.freeze()
+    tx_copy = pickle.loads(pickle.dumps(tx))
+    assert tx_copy == tx
+    assert tx_copy.frozen()
+
+
+def test_rpc_dumps():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_data1, bytearray([0x00, 0x01]))
+    kype = pyckb.core.Script(bytearray(range(32)), pyckb.core.script_hash_type_type, bytearray())
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    assert json.loads(tx.rpc_dumps()) == tx.rpc()
+    tx.raw.cell_deps.append(pyckb.core.CellDep(pyckb.core.OutPoint(bytearray(32), 0), 1))
+    tx.raw.header_deps.append(bytearray(range(32)))
+    tx.raw.inputs.append(pyckb.core.CellInput(0x10, pyckb.core.OutPoint(bytearray(32), 1)))
+    tx.raw.outputs.append(pyckb.core.CellOutput(100, lock, None))
+    tx.raw.outputs.append(pyckb.core.CellOutput(200, lock, kype))
+    tx.raw.outputs_data.append(bytearray())
+    tx.raw.outputs_data.append(bytearray([0xff]))
+    tx.witnesses.append(pyckb.core.WitnessArgs(bytearray(65), None, None).molecule())
+    assert json.loads(tx.rpc_dumps()) == tx.rpc()
+
+
+def test_witness_args_patch_lock():
+    data = pyckb.core.WitnessArgs(bytearray(65), bytearray(1024), bytearray([0x01])).molecule()
+    assert pyckb.core.WitnessArgs.peek_lock(data) == bytearray(65)
+    sign = bytearray(range(65))
+    pyckb.core.WitnessArgs.patch_lock(data, sign)
+    assert pyckb.core.WitnessArgs.peek_lock(data) == sign
+    assert pyckb.core.WitnessArgs.molecule_decode(data) == pyckb.core.WitnessArgs(sign, bytearray(1024), bytearray([1]))
+    assert pyckb.core.WitnessArgs.peek_lock(pyckb.core.WitnessArgs(None, None, None).molecule()) is None
+
+
+def test_addr_many():
+    pyckb.config.current = pyckb.config.mainnet
+    addrv0 = 'ckb1qyqt8xaupvm8837nv3gtc9x0ekkj64vud3jqfwyw5v'
+    addrv1 = 'ckb1qzda0cr08m85hc8jlnfp3zer7xulejywt49kt2rr0vthywaa50xwsqdnnw7qkdnnclfkg59uzn8umtfd2kwxceqxwquc4'
+    r = pyckb.core.Script.addr_decode_many([addrv0, addrv1, addrv1[:-1] + 'q', 'ckb1', addrv1.replace('ckb', 'ckt')])
+    assert r[0] == r[1]
+    assert all([isinstance(e, Exception) for e in r[2:]])
+    assert pyckb.core.Script.addr_many([r[0], r[1]]) == [addrv1, addrv1]
+    assert r[0].addr() == addrv1
@@ -0,0 +1,43 @@
+import pyckb
+
+
+def header(number: int, epoch: int, ar: int) -> pyckb.core.Header:
+    dao = pyckb.core.dao_encode(0, ar, 0, 0)
+    return pyckb.core.Header(pyckb.core.RawHeader(
+        0, 0, 0, number, epoch, bytearray(32), bytearray(32), bytearray(32), bytearray(32), dao), 0)
+
+
+def test_calculator():
+    headers = {
+        1: header(1, pyckb.core.epoch_encode(1000, 1797, 1799), 10**16),
+        2: header(2, pyckb.core.epoch_encode(1180, 1797, 1799), 10**16 * 11 // 10),
+        3: header(3, pyckb.core.epoch_encode(1180, 1798, 1799), 10**16 * 12 // 10),
+    }
+    lookup = []
+
+    def source(n: int) -> pyckb.core.Header:
+        lookup.append(n)
+        return headers[n]
+    dao = pyckb.dao.Calculator(source)
+    ckb = pyckb.denomination.ckbytes
+    assert dao.maximum_withdraw_many([(1102 * ckb, 102 * ckb, 1, 2)] * 100) == [1202 * ckb] * 100
+    assert dao.maximum_withdraw(1102 * ckb, 102 * ckb, 1, 3) == 1302 * ckb
+    # Exactly 180 epochs later is still within the first lock period.
+    assert dao.since(1, 2) == 0x2000000000000000 | pyckb.core.epoch_encode(1180, 1797, 1799)
+    assert dao.since_many([(1, 3)]) == [0x2000000000000000 | pyckb.core.epoch_encode(1360, 1797, 1799)]
+    assert sorted(lookup) == [1, 2, 3]
+
+
+def test_mature():
+    since = pyckb.dao.since(pyckb.core.epoch_encode(10, 1, 4), pyckb.core.epoch_encode(20, 0, 8))
+    assert since == 0x2000000000000000 | pyckb.core.epoch_encode(190, 1, 4)
+    assert not pyckb.dao.mature(since, pyckb.core.epoch_encode(190, 1, 5))
+    assert pyckb.dao.mature(since, pyckb.core.epoch_encode(190, 2, 8))
+    assert pyckb.dao.mature(since, pyckb.core.epoch_encode(191, 0, 8))
+
+
+def test_occupied():
+    lock = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray(20))
+    kype = pyckb.core.Script(bytearray(32), pyckb.core.script_hash_type_type, bytearray())
+    output = pyckb.core.CellOutput(0, lock, kype)
+    assert pyckb.dao.occupied(output, bytearray(8)) == 102 * pyckb.denomination.ckbytes
@@ -0,0 +1,22 @@
+import pyckb
+
+
+def test_decode_array():
+    kype = pyckb.molecule.Slice(pyckb.molecule.U64)
+    data = kype.encode([0, 1, 0xffffffffffffffff])
+    assert list(kype.decode_array(data)) == [0, 1, 0xffffffffffffffff]
+    kype = pyckb.molecule.Array(pyckb.molecule.I16, 2)
+    data = kype.encode([-1, 2])
+    assert list(kype.decode_array(data)) == [-1, 2]
+
+
+def test_decode_view():
+    kype = pyckb.molecule.Slice(pyckb.molecule.Byte32)
+    hash = [bytearray([i] * 32) for i in range(4)]
+    data = kype.encode(hash)
+    assert kype.decode(data) == hash
+    assert [bytearray(e) for e in kype.decode_view(data)] == hash
+    out_point = [pyckb.core.OutPoint(bytearray([i] * 32), i) for i in range(4)]
+    kype = pyckb.molecule.Slice(pyckb.molecule.Custom(pyckb.core.OutPoint.molecule_size()))
+    data = kype.encode([e.molecule() for e in out_point])
+    assert [pyckb.core.OutPoint.molecule_decode(bytearray(e)) for e in kype.decode_view(data)] == out_point
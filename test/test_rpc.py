@@ -1,4 +1,10 @@
+import concurrent.futures
+import itertools
+import json
 import pyckb
+import pytest
+import requests
+import time
 
 
 def test_get_cells():
@@ -56,3 +62,181 @@ def test_get_tip_block_numner():
     pyckb.config.upgrade('http://127.0.0.1:8114')
     pyckb.config.current = pyckb.config.develop
     assert int(pyckb.rpc.get_tip_block_number(), 16) >= 0
+
+
+def test_get_header_by_number_decode():
+    pyckb.config.upgrade('http://127.0.0.1:8114')
+    pyckb.config.current = pyckb.config.develop
+    header = pyckb.rpc.get_header_by_number_decode('0x1')
+    assert header == pyckb.core.Header.rpc_decode(pyckb.rpc.get_header_by_number('0x1'))
+
+
+def test_get_transaction_decode():
+    pyckb.config.upgrade('http://127.0.0.1:8114')
+    pyckb.config.current = pyckb.config.develop
+    block = pyckb.rpc.get_block_by_number_decode('0x0')
+    tx_hash = '0x' + block.transactions[0].raw.hash().hex()
+    assert pyckb.rpc.get_transaction_decode(tx_hash)['transaction'] == block.transactions[0]
+
+
+def test_scan():
+    txs = [{'n': i, 's': '\\"]}' * i, 'l': [[], {}]} for i in range(8)]
+    doc = {'result': {'header': {'hash': '[{"'}, 'transactions': txs}}
+    data = json.dumps(doc).encode()
+    for n in [1, 3, 1024]:
+        chunks = [data[i:i+n] for i in range(0, len(data), n)]
+        assert list(pyckb.rpc.scan(chunks, ['result', 'transactions'])) == txs
+
+
+def test_get_block_by_number_stream():
+    pyckb.config.upgrade('http://127.0.0.1:8114')
+    pyckb.config.current = pyckb.config.develop
+    block = pyckb.rpc.get_block_by_number_decode('0x0')
+    assert list(pyckb.rpc.get_block_by_number_stream('0x0')) == block.transactions
+
+
+def test_transport(rpc_server):
+    peer = rpc_server(lambda body: {'id': body['id'], 'jsonrpc': '2.0', 'result': body['params']})
+    t = pyckb.rpc.Transport(pyckb.config.current.rpc.url, 4, (1, 1))
+    for i in range(8):
+        assert t.post(json={'id': i, 'jsonrpc': '2.0', 'method': 'echo', 'params': [i]}).json()['result'] == [i]
+    # All calls were made on one kept alive connection.
+    assert len(set(peer)) == 1
+    # Threads share the connections, no more than the pool size are opened.
+
+    def echo(i: int) -> list:
+        return t.post(json={'id': i, 'jsonrpc': '2.0', 'method': 'echo', 'params': [i]}).json()['result']
+    with concurrent.futures.ThreadPoolExecutor(16) as pool:
+        assert list(pool.map(echo, range(64))) == [[i] for i in range(64)]
+    assert len(set(peer)) <= 4
+
+
+def test_batch(rpc_server):
+    def handle(body: list) -> list:
+        resp = []
+        # Answer out of order, as the spec allows, drop some calls, and fail the calls of an unknown method.
+        for e in reversed(body):
+            if e['method'] == 'drop':
+                continue
+            # Answer with ids that were never sent.
+            if e['method'] == 'bogus':
+                resp.append({'id': 'x', 'jsonrpc': '2.0', 'result': e['params']})
+                resp.append({'id': len(body), 'jsonrpc': '2.0', 'result': e['params']})
+                continue
+            if e['method'] == 'echo':
+                resp.append({'id': e['id'], 'jsonrpc': '2.0', 'result': e['params']})
+            else:
+                resp.append({'id': e['id'], 'jsonrpc': '2.0', 'error': {'code': -32601, 'message': 'not found'}})
+        return resp
+    rpc_server(handle)
+    assert pyckb.rpc.batch([]) == []
+    r = pyckb.rpc.batch([('echo', [0]), ('fail', [1]), ('echo', [2])])
+    assert r[0] == [0]
+    assert isinstance(r[1], Exception)
+    assert r[2] == [2]
+    r = pyckb.rpc.batch([('drop', [0]), ('echo', [1]), ('drop', [2])])
+    assert r[0] is not r[2]
+    assert str(r[0]) == 'rpc: missing response for id 0'
+    assert str(r[2]) == 'rpc: missing response for id 2'
+    r = pyckb.rpc.batch([('bogus', [0]), ('echo', [1])])
+    assert str(r[0]) == 'rpc: missing response for id 0'
+    assert r[1] == [1]
+
+
+def test_iter_blocks(rpc_server):
+    def handle(body: dict) -> dict:
+        if body['method'] == 'get_tip_block_number':
+            return {'id': body['id'], 'jsonrpc': '2.0', 'result': '0x10'}
+        n = int(body['params'][0], 16)
+        # Later blocks are served faster, so the fetches complete out of order.
+        time.sleep((16 - n) / 1000)
+        header = pyckb.core.Header(pyckb.core.RawHeader(
+            0, 0x1a08a97e, 0, n, 0, bytearray(32), bytearray(32), bytearray(32), bytearray(32), bytearray(32),
+        ), 0)
+        result = f'0x{pyckb.core.Block(header, [], [], []).molecule().hex()}'
+        return {'id': body['id'], 'jsonrpc': '2.0', 'result': result}
+    rpc_server(handle)
+    assert [e.header.raw.number for e in pyckb.rpc.iter_blocks(0, 16, 4)] == list(range(16))
+    assert [e.header.raw.number for e in itertools.islice(pyckb.rpc.iter_blocks(4, 16, 4), 2)] == [4, 5]
+    assert list(pyckb.rpc.iter_blocks(4, 4)) == []
+
+
+def test_cache(tmp_path):
+    c = pyckb.rpc.Cache(64)
+    c.set('a', 'x' * 28)
+    c.set('b', 'y' * 28)
+    assert c.get('a') == 'x' * 28
+    # Adding c evicts b, the least recently used.
+    c.set('c', 'z' * 28)
+    assert c.get('b') is None
+    assert c.get('c') == 'z' * 28
+    assert c.hits == 2
+    assert c.miss == 1
+    # Results outlive the lru in the database, and are shared with another cache on the same file.
+    d = pyckb.rpc.Cache(64, str(tmp_path / 'cache.db'))
+    d.set('a', {'a': 1})
+    d.set('b', {'b': 2})
+    d.set('c', {'c': 3})
+    assert pyckb.rpc.Cache(64, str(tmp_path / 'cache.db')).get('a') == {'a': 1}
+
+
+def test_call_cache(rpc_server):
+    count = []
+
+    def handle(body: dict) -> dict:
+        count.append(body['params'])
+        if body['method'] == 'get_tip_block_number':
+            return {'id': body['id'], 'jsonrpc': '2.0', 'result': '0x100'}
+        # Transaction 0x01 is committed deep below the tip, 0x02 is pending and 0x03 is committed near the tip.
+        status = {
+            '0x01': {'status': 'committed', 'block_number': '0x10'},
+            '0x02': {'status': 'pending', 'block_number': None},
+            '0x03': {'status': 'committed', 'block_number': '0xff'},
+        }[body['params'][0]]
+        return {'id': body['id'], 'jsonrpc': '2.0', 'result': {'transaction': {}, 'tx_status': status}}
+    rpc_server(handle)
+    # Without a cache every call is sent.
+    assert pyckb.rpc.cache is None
+    pyckb.rpc.get_transaction('0x01')
+    pyckb.rpc.get_transaction('0x01')
+    assert count.count(['0x01']) == 2
+    count.clear()
+    pyckb.rpc.cache = pyckb.rpc.Cache(1 << 20)
+    try:
+        for _ in range(4):
+            pyckb.rpc.get_transaction('0x01')
+            pyckb.rpc.get_transaction('0x02')
+            pyckb.rpc.get_transaction('0x03')
+        # The final transaction is fetched once, the pending and the shallow ones every time.
+        assert count.count(['0x01']) == 1
+        assert count.count(['0x02']) == 4
+        assert count.count(['0x03']) == 4
+        assert pyckb.rpc.cache.hits == 3
+        # Callers get their own copy of a cached result.
+        pyckb.rpc.get_transaction('0x01')['transaction'] = None
+        assert pyckb.rpc.get_transaction('0x01')['transaction'] == {}
+    finally:
+        pyckb.rpc.cache = None
+
+
+def test_scan_fallback():
+    path = ['result', 'transactions']
+    # A null result, such as an unknown block, yields nothing.
+    assert list(pyckb.rpc.scan([b'{"id":1,"jsonrpc":"2.0","result":null}'], path)) == []
+    # An error larger than one chunk is parsed from the whole response.
+    data = json.dumps({'id': 1, 'jsonrpc': '2.0', 'error': {'code': -1, 'message': 'x' * (1 << 17)}}).encode()
+    with pytest.raises(Exception) as e:
+        list(pyckb.rpc.scan([data[i:i + 4096] for i in range(0, len(data), 4096)], path))
+    assert e.value.args[0]['message'] == 'x' * (1 << 17)
+
+
+def test_call_stream(rpc_server):
+    def handle(body: dict) -> dict | int:
+        if body['params'][0] == '0x0':
+            return {'id': body['id'], 'jsonrpc': '2.0', 'result': {'transactions': [{'n': 0}, {'n': 1}]}}
+        return 503
+    rpc_server(handle)
+    path = ['result', 'transactions']
+    assert list(pyckb.rpc.call_stream('get_block_by_number', ['0x0'], path)) == [{'n': 0}, {'n': 1}]
+    with pytest.raises(requests.HTTPError):
+        list(pyckb.rpc.call_stream('get_block_by_number', ['0x1'], path))
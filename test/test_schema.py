@@ -0,0 +1,99 @@
+import pyckb
+import pytest
+
+schema = '''
+// Part of https://github.com/nervosnetwork/ckb/blob/develop/util/gen-types/schemas/blockchain.mol
+array Uint32 [byte; 4];
+array Uint64 [byte; 8];
+array Byte32 [byte; 32];
+vector Bytes <byte>;
+option BytesOpt (Bytes);
+vector BytesVec <Bytes>;
+vector Byte32Vec <Byte32>;
+
+table Script {
+    code_hash:      Byte32,
+    hash_type:      byte,
+    args:           Bytes,
+}
+option ScriptOpt (Script);
+
+struct OutPoint {
+    tx_hash:        Byte32,
+    index:          Uint32,
+}
+
+struct CellInput {
+    since:          Uint64,
+    previous_output: OutPoint,
+}
+vector CellInputVec <CellInput>;
+
+table CellOutput {
+    capacity:       Uint64,
+    lock:           Script,
+    type_:          ScriptOpt,
+}
+vector CellOutputVec <CellOutput>;
+
+/* WitnessArgs is used by most lock scripts. */
+table WitnessArgs {
+    lock:           BytesOpt,
+    input_type:     BytesOpt,
+    output_type:    BytesOpt,
+}
+
+union ScriptOrBytes {
+    Script,
+    Bytes: 8,
+}
+'''
+
+
+def test_schema(tmp_path):
+    mol = pyckb.schema.loads(schema, str(tmp_path))
+    lock = pyckb.core.Script(bytearray(range(32)), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01, 0x02]))
+    output = pyckb.core.CellOutput(0x10, lock, lock)
+    output_bin = output.molecule()
+    output_mol = mol.CellOutput.decode(output_bin)
+    assert output_mol.capacity == output.capacity.to_bytes(8, 'little')
+    assert output_mol.lock.code_hash == lock.code_hash
+    assert output_mol.lock.hash_type == lock.hash_type
+    assert output_mol.lock.args == lock.args
+    assert mol.CellOutput.encode(output_mol) == output_bin
+    cell_input = pyckb.core.CellInput(0x20, pyckb.core.OutPoint(bytearray(range(32)), 1))
+    cell_input_mol = mol.CellInput.decode(cell_input.molecule())
+    assert cell_input_mol.previous_output.tx_hash == cell_input.previous_output.tx_hash
+    assert mol.CellInput.encode(cell_input_mol) == cell_input.molecule()
+    assert mol.CellInput.size() == pyckb.core.CellInput.molecule_size()
+    assert mol.CellInputVec.decode(mol.CellInputVec.encode([cell_input_mol] * 2)) == [cell_input_mol] * 2
+    witness_args = pyckb.core.WitnessArgs(bytearray(65), None, bytearray([0x01]))
+    witness_args_mol = mol.WitnessArgs.decode(witness_args.molecule())
+    assert witness_args_mol.lock == witness_args.lock
+    assert witness_args_mol.input_type is None
+    assert mol.WitnessArgs.encode(witness_args_mol) == witness_args.molecule()
+    union = mol.ScriptOrBytes.encode(('Bytes', bytearray([0x01])))
+    assert union[:4] == bytearray([0x08, 0x00, 0x00, 0x00])
+    assert mol.ScriptOrBytes.decode(union) == ('Bytes', bytearray([0x01]))
+    # The second load hits the cache.
+    assert len(list(tmp_path.glob('*.py'))) == 1
+    mol = pyckb.schema.loads(schema, str(tmp_path))
+    assert len(list(tmp_path.glob('*.py'))) == 1
+    assert mol.Script.decode(lock.molecule()).args == lock.args
+
+
+def test_schema_table_offsets(tmp_path):
+    mol = pyckb.schema.loads(schema, str(tmp_path))
+    lock = pyckb.core.Script(bytearray(range(32)), pyckb.core.script_hash_type_type, bytearray([0x00, 0x01, 0x02]))
+    data = lock.molecule()
+    # Swap the offsets of the last two fields, so they are no longer in order.
+    head = data[8:12]
+    data[8:12] = data[12:16]
+    data[12:16] = head
+    with pytest.raises(AssertionError):
+        mol.Script.decode(data)
+    # The first offset points beyond the buffer.
+    data = lock.molecule()
+    data[4:8] = (len(data) + 4).to_bytes(4, 'little')
+    with pytest.raises(AssertionError):
+        mol.Script.decode(data)
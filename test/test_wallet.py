@@ -52,3 +52,23 @@ def test_wallet_dao():
     pyckb.rpc.wait(f'0x{hash.hex()}')
     hash = user.dao_prepare(pyckb.core.OutPoint(hash, 0))
     pyckb.rpc.wait(f'0x{hash.hex()}')
+
+
+def test_wallet_send_transaction_cells(monkeypatch):
+    pyckb.config.current = pyckb.config.develop
+    user = pyckb.wallet.Wallet(1)
+    mate = pyckb.wallet.Wallet(2)
+    user.cells = pyckb.cellset.CellSet()
+    spent = pyckb.core.OutPoint(bytearray(32), 0)
+    user.cells.add(spent, pyckb.core.CellOutput(1000, user.script, None), bytearray())
+    tx = pyckb.core.Transaction(pyckb.core.RawTransaction(0, [], [], [], [], []), [])
+    tx.raw.inputs.append(pyckb.core.CellInput(0, spent))
+    tx.raw.outputs.append(pyckb.core.CellOutput(300, mate.script, None))
+    tx.raw.outputs.append(pyckb.core.CellOutput(600, user.script, None))
+    tx.raw.outputs_data.extend([bytearray(), bytearray()])
+    monkeypatch.setattr(pyckb.rpc, 'send_transaction', lambda tx: f'0x{tx.raw.hash().hex()}')
+    user.send_transaction(tx)
+    # The input is spent and the change is live, the output of the mate is not tracked.
+    assert spent not in user.cells
+    assert pyckb.core.OutPoint(tx.raw.hash(), 1) in user.cells
+    assert user.capacity() == 600